@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Offline benchmarks for the bot's data paths. No network or Discord token needed.
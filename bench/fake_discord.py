@@ -0,0 +1,420 @@
+# bench/fake_discord.py
+# Local stand-in for Discord's REST API, just wide enough for the bot's flows.
+import re, json, time, random, asyncio, hashlib, itertools
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from aiohttp import web
+
+API_PREFIX = "/api/v10"
+APP_ID = 900_000_000_000_000_001
+BOT_ID = 900_000_000_000_000_002
+EPHEMERAL = 1 << 6
+
+_ids = itertools.count(1_100_000_000_000_000_000)
+
+
+def snowflake() -> int:
+    return next(_ids)
+
+
+def user_payload(uid: int, bot: bool = False) -> Dict[str, Any]:
+    name = "wr-bot" if bot else f"player{uid % 100_000}"
+    return {"id": str(uid), "username": name, "global_name": name.title(), "discriminator": "0",
+            "avatar": None, "bot": bot}
+
+
+def role_payload(rid: int, name: str, position: int, permissions: int = 0) -> Dict[str, Any]:
+    return {"id": str(rid), "name": name, "color": 0, "hoist": False, "position": position,
+            "permissions": str(permissions), "managed": False, "mentionable": False, "flags": 0}
+
+
+def member_payload(uid: int, roles: List[int], bot: bool = False) -> Dict[str, Any]:
+    return {"user": user_payload(uid, bot), "roles": [str(r) for r in roles], "nick": None,
+            "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+
+
+class FakeGuildState:
+    """Server-side truth for one guild: roles, members, channels and their messages."""
+
+    def __init__(self, gid: int, name: str, member_ids: List[int], channel_names: List[str], role_names: List[str]):
+        self.id = gid
+        self.name = name
+        self.roles: Dict[int, Dict[str, Any]] = {gid: role_payload(gid, "@everyone", 0, 1 << 10)}
+        for pos, rname in enumerate(role_names, start=1):
+            rid = snowflake()
+            self.roles[rid] = role_payload(rid, rname, pos)
+        bot_role = snowflake()
+        self.roles[bot_role] = role_payload(bot_role, "WR Bot", len(self.roles), 8)
+        self.members: Dict[int, Dict[str, Any]] = {BOT_ID: member_payload(BOT_ID, [bot_role], bot=True)}
+        for uid in member_ids:
+            self.members[uid] = member_payload(uid, [])
+        self.channels: Dict[int, Dict[str, Any]] = {}
+        for pos, cname in enumerate(channel_names):
+            self.add_channel(cname, pos)
+        # channel id -> message id -> message payload (insertion order = post order)
+        self.messages: Dict[int, Dict[int, Dict[str, Any]]] = {cid: {} for cid in self.channels}
+
+    def add_channel(self, name: str, position: int) -> Dict[str, Any]:
+        cid = snowflake()
+        ch = {"id": str(cid), "type": 0, "name": name, "position": position, "guild_id": str(self.id),
+              "permission_overwrites": [], "parent_id": None, "nsfw": False, "topic": None,
+              "rate_limit_per_user": 0}
+        self.channels[cid] = ch
+        return ch
+
+    def channel_id(self, name: str) -> Optional[int]:
+        return next((cid for cid, ch in self.channels.items() if ch["name"] == name), None)
+
+    def payload(self) -> Dict[str, Any]:
+        """GUILD_CREATE-style payload to seed the bot's cache with."""
+        return {
+            "id": str(self.id), "name": self.name, "owner_id": str(next(iter(self.members))),
+            "roles": list(self.roles.values()), "channels": list(self.channels.values()),
+            "members": list(self.members.values()), "member_count": len(self.members),
+            "emojis": [], "stickers": [], "features": [], "threads": [], "stage_instances": [],
+            "guild_scheduled_events": [], "premium_tier": 0, "verification_level": 0,
+            "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0,
+            "nsfw_level": 0, "preferred_locale": "en-US", "large": False, "unavailable": False,
+        }
+
+
+def _message(channel_id: int, body: Dict[str, Any], guild_id: Optional[int] = None,
+             mid: Optional[int] = None) -> Dict[str, Any]:
+    msg = {
+        "id": str(mid or snowflake()), "channel_id": str(channel_id), "author": user_payload(BOT_ID, bot=True),
+        "content": body.get("content") or "", "embeds": body.get("embeds") or [],
+        "components": body.get("components") or [], "attachments": [], "mentions": [], "mention_roles": [],
+        "mention_everyone": False, "pinned": False, "tts": False, "type": 0, "flags": body.get("flags", 0) or 0,
+        "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None,
+    }
+    if guild_id:
+        msg["guild_id"] = str(guild_id)
+    return msg
+
+
+def _edit(msg: Dict[str, Any], body: Dict[str, Any]):
+    for key in ("content", "embeds", "components", "flags"):
+        if key in body:
+            msg[key] = body[key] if body[key] is not None else ([] if key != "content" else "")
+    msg["edited_timestamp"] = "2024-01-01T00:00:01+00:00"
+
+
+def _json(body: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # discord.py only parses bodies whose content type is exactly application/json (no charset)
+    return web.Response(body=json.dumps(body).encode(), status=status, headers={**(headers or {}), "Content-Type": "application/json"})
+
+
+class RateLimiter:
+    """Fixed-window limit per bucket (method + route template + major id), like Discord's per-route limits."""
+
+    def __init__(self, limit: int, per: float, chaos: float = 0.0):
+        self.limit = limit
+        self.per = per
+        self.chaos = chaos
+        self._windows: Dict[str, Tuple[float, int]] = {}
+
+    def check(self, route: str, major: str) -> Tuple[Optional[float], Dict[str, str]]:
+        """Returns (retry_after if limited, rate-limit headers)."""
+        bucket = f"{route} {major}"
+        now = time.monotonic()
+        start, used = self._windows.get(bucket, (now, 0))
+        if now - start >= self.per:
+            start, used = now, 0
+        reset_after = max(self.per - (now - start), 0.001)
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            # Like Discord, the hash names the route's limit; the major id only picks the window
+            "X-RateLimit-Bucket": hashlib.md5(route.encode()).hexdigest()[:16],
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+        }
+        if used >= self.limit or (self.chaos and random.random() < self.chaos):
+            headers["X-RateLimit-Remaining"] = "0"
+            return reset_after, headers
+        self._windows[bucket] = (start, used + 1)
+        headers["X-RateLimit-Remaining"] = str(self.limit - used - 1)
+        return None, headers
+
+
+class FakeDiscord:
+    """aiohttp app answering the REST routes the cogs use.
+
+    Every request is appended to `calls` as (monotonic time, method, route
+    template, status). Interaction callbacks are kept per interaction id in
+    `responses` so a driver can read the components it was sent, the way a
+    real client would. State changes the bot would normally learn about from
+    the gateway (role and member updates) are passed to `on_event`.
+    """
+
+    def __init__(self, guilds: List[FakeGuildState], limiter: Optional[RateLimiter] = None, rtt: float = 0.0):
+        self.guilds = {g.id: g for g in guilds}
+        self.limiter = limiter
+        self.rtt = rtt
+        self.calls: List[Tuple[float, str, str, int]] = []
+        self.rate_limited = 0
+        self.responses: Dict[int, List[Dict[str, Any]]] = {}
+        self.first_response: Dict[int, float] = {}
+        # webhook token -> original response message; message id -> ephemeral message
+        self.originals: Dict[str, Dict[str, Any]] = {}
+        self.ephemeral: Dict[int, Dict[str, Any]] = {}
+        self.token_interaction: Dict[str, int] = {}
+        # interaction id -> (channel id, id of the message its component was on); set by the driver
+        self.context: Dict[int, Tuple[int, Optional[int]]] = {}
+        self.on_event: Callable[[str, Dict[str, Any]], Any] = lambda event, data: None
+        self.routes: List[Tuple[str, "re.Pattern", Callable]] = []
+        self._route("GET", r"/users/@me", self.get_me)
+        self._route("GET", r"/oauth2/applications/@me", self.get_app)
+        self._route("PUT", r"/applications/(?P<app>\d+)(/guilds/\d+)?/commands", self.put_commands)
+        self._route("POST", r"/interactions/(?P<iid>\d+)/(?P<token>[^/]+)/callback", self.interaction_callback)
+        self._route("GET", r"/webhooks/(?P<app>\d+)/(?P<token>[^/]+)/messages/@original", self.get_original)
+        self._route("PATCH", r"/webhooks/(?P<app>\d+)/(?P<token>[^/]+)/messages/@original", self.edit_original)
+        self._route("POST", r"/webhooks/(?P<app>\d+)/(?P<token>[^/]+)", self.followup)
+        self._route("GET", r"/channels/(?P<cid>\d+)/messages", self.history)
+        self._route("POST", r"/channels/(?P<cid>\d+)/messages", self.send)
+        self._route("PATCH", r"/channels/(?P<cid>\d+)/messages/(?P<mid>\d+)", self.edit)
+        self._route("POST", r"/guilds/(?P<gid>\d+)/roles", self.create_role)
+        self._route("PATCH", r"/guilds/(?P<gid>\d+)/roles", self.move_roles)
+        self._route("PATCH", r"/guilds/(?P<gid>\d+)/roles/(?P<rid>\d+)", self.edit_role)
+        self._route("PATCH", r"/guilds/(?P<gid>\d+)/members/(?P<uid>\d+)", self.edit_member)
+        self._route("PUT", r"/guilds/(?P<gid>\d+)/members/(?P<uid>\d+)/roles/(?P<rid>\d+)", self.add_member_role)
+        self._route("DELETE", r"/guilds/(?P<gid>\d+)/members/(?P<uid>\d+)/roles/(?P<rid>\d+)", self.remove_member_role)
+        self._route("POST", r"/guilds/(?P<gid>\d+)/channels", self.create_channel)
+        self.app = web.Application()
+        self.app.router.add_route("*", API_PREFIX + "/{tail:.*}", self.handle)
+        self._runner: Optional[web.AppRunner] = None
+        self.base = ""
+
+    def _route(self, method: str, pattern: str, handler: Callable):
+        self.routes.append((method, re.compile(f"^{pattern}$"), handler))
+
+    async def start(self, host: str = "127.0.0.1") -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base = f"http://{host}:{port}{API_PREFIX}"
+        return self.base
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def idle(self, quiet: float, timeout: float = 60.0):
+        """Wait until no request has arrived for `quiet` seconds."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            last = self.calls[-1][0] if self.calls else 0.0
+            if time.monotonic() - last >= quiet:
+                return
+            await asyncio.sleep(quiet / 4)
+
+    # ------------------------- dispatch -------------------------
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        path = "/" + request.match_info["tail"]
+        for method, pattern, handler in self.routes:
+            m = pattern.match(path)
+            if m and method == request.method:
+                template = pattern.pattern
+                break
+        else:
+            handler, m, template = None, None, path
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+
+        headers: Dict[str, str] = {}
+        # Interaction callbacks aren't rate limited by Discord; everything else is
+        if self.limiter and handler is not self.interaction_callback:
+            major = next((v for k, v in (m.groupdict() if m else {}).items() if k in ("cid", "gid", "token")), "")
+            retry_after, headers = self.limiter.check(f"{request.method} {template}", major)
+            if retry_after is not None:
+                self.rate_limited += 1
+                self.calls.append((time.monotonic(), request.method, template, 429))
+                body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": False}
+                return _json(body, status=429, headers={**headers, "Via": "1.1 google",
+                                                                     "X-RateLimit-Scope": "user"})
+        if handler is None:
+            self.calls.append((time.monotonic(), request.method, template, 404))
+            return _json({"message": "Unknown route", "code": 0}, status=404)
+
+        body = await self._body(request)
+        status, out = await handler(request, body, **m.groupdict())
+        self.calls.append((time.monotonic(), request.method, template, status))
+        if status == 204:
+            return web.Response(status=204, headers=headers)
+        return _json(out, status=status, headers=headers)
+
+    async def _body(self, request: web.Request) -> Dict[str, Any]:
+        if not request.can_read_body:
+            return {}
+        if request.content_type.startswith("multipart/"):
+            form = await request.post()
+            raw = form.get("payload_json")
+            return json.loads(raw) if raw else {}
+        try:
+            return await request.json()
+        except ValueError:
+            return {}
+
+    def find_message(self, channel_id: int, message_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        if message_id in self.ephemeral:
+            return self.ephemeral[message_id]
+        g = self._guild_of_channel(channel_id)
+        return g.messages[channel_id].get(message_id) if g else None
+
+    def _guild_of_channel(self, cid: int) -> Optional[FakeGuildState]:
+        return next((g for g in self.guilds.values() if cid in g.channels), None)
+
+    def _not_found(self, what: str, code: int):
+        return 404, {"message": f"Unknown {what}", "code": code}
+
+    # ------------------------- auth / commands -------------------------
+    async def get_me(self, request, body):
+        return 200, user_payload(BOT_ID, bot=True)
+
+    async def get_app(self, request, body):
+        return 200, {"id": str(APP_ID), "name": "WR Bot", "description": "", "icon": None, "rpc_origins": [],
+                     "bot_public": True, "bot_require_code_grant": False, "owner": user_payload(1),
+                     "verify_key": "0" * 64, "team": None, "flags": 0, "summary": ""}
+
+    async def put_commands(self, request, body, app):
+        out = []
+        for cmd in body or []:
+            out.append({**cmd, "id": str(snowflake()), "application_id": app, "version": "1",
+                        "default_member_permissions": cmd.get("default_member_permissions"), "dm_permission": True})
+        return 200, out
+
+    # ------------------------- interactions -------------------------
+    async def interaction_callback(self, request, body, iid, token):
+        iid = int(iid)
+        self.first_response.setdefault(iid, time.monotonic())
+        self.responses.setdefault(iid, []).append(body)
+        self.token_interaction[token] = iid
+        kind, data = body.get("type"), body.get("data") or {}
+        channel_id, message_id = self.context.get(iid, (0, None))
+        if kind in (4, 5):  # channel message (or its deferred placeholder)
+            msg = _message(channel_id, data, mid=snowflake())
+            msg["flags"] = data.get("flags", 0) or 0
+            msg["interaction"] = {"id": str(iid), "type": 3, "name": "", "user": user_payload(1)}
+            self.originals[token] = msg
+            if msg["flags"] & EPHEMERAL:
+                self.ephemeral[int(msg["id"])] = msg
+        elif kind == 7:  # update the message the component was on
+            msg = self.find_message(channel_id, message_id)
+            if msg:
+                _edit(msg, data)
+        return 204, None
+
+    async def get_original(self, request, body, app, token):
+        msg = self.originals.get(token)
+        return (200, msg) if msg else self._not_found("Message", 10008)
+
+    async def edit_original(self, request, body, app, token):
+        msg = self.originals.get(token)
+        if not msg:
+            return self._not_found("Message", 10008)
+        _edit(msg, body)
+        return 200, msg
+
+    async def followup(self, request, body, app, token):
+        iid = self.token_interaction.get(token)
+        msg = _message(self.context.get(iid, (0, None))[0], body)
+        if iid is not None:
+            self.responses.setdefault(iid, []).append({"type": "followup", "data": body})
+        if msg["flags"] & EPHEMERAL:
+            self.ephemeral[int(msg["id"])] = msg
+        return 200, msg
+
+    # ------------------------- channels -------------------------
+    async def history(self, request, body, cid):
+        g = self._guild_of_channel(int(cid))
+        if not g:
+            return self._not_found("Channel", 10003)
+        limit = int(request.query.get("limit", 50))
+        msgs = list(g.messages[int(cid)].values())[::-1][:limit]
+        return 200, msgs
+
+    async def send(self, request, body, cid):
+        g = self._guild_of_channel(int(cid))
+        if not g:
+            return self._not_found("Channel", 10003)
+        msg = _message(int(cid), body, g.id)
+        g.messages[int(cid)][int(msg["id"])] = msg
+        return 200, msg
+
+    async def edit(self, request, body, cid, mid):
+        g = self._guild_of_channel(int(cid))
+        msg = g.messages[int(cid)].get(int(mid)) if g else None
+        if not msg:
+            return self._not_found("Message", 10008)
+        _edit(msg, body)
+        return 200, msg
+
+    async def create_channel(self, request, body, gid):
+        g = self.guilds[int(gid)]
+        ch = g.add_channel(body.get("name", "channel"), len(g.channels))
+        g.messages[int(ch["id"])] = {}
+        self.on_event("CHANNEL_CREATE", ch)
+        return 201, ch
+
+    # ------------------------- roles / members -------------------------
+    async def create_role(self, request, body, gid):
+        g = self.guilds[int(gid)]
+        rid = snowflake()
+        role = role_payload(rid, body.get("name", "new role"), 1, int(body.get("permissions", 0) or 0))
+        role["color"] = body.get("color", 0) or 0
+        g.roles[rid] = role
+        self.on_event("GUILD_ROLE_CREATE", {"guild_id": gid, "role": role})
+        return 200, role
+
+    async def move_roles(self, request, body, gid):
+        g = self.guilds[int(gid)]
+        for entry in body or []:
+            role = g.roles.get(int(entry["id"]))
+            if role:
+                role["position"] = entry["position"]
+                self.on_event("GUILD_ROLE_UPDATE", {"guild_id": gid, "role": role})
+        return 200, list(g.roles.values())
+
+    async def edit_role(self, request, body, gid, rid):
+        g = self.guilds[int(gid)]
+        role = g.roles.get(int(rid))
+        if not role:
+            return self._not_found("Role", 10011)
+        role.update({k: v for k, v in body.items() if k in ("name", "color", "hoist", "mentionable", "position")})
+        self.on_event("GUILD_ROLE_UPDATE", {"guild_id": gid, "role": role})
+        return 200, role
+
+    def _member_changed(self, g: FakeGuildState, member: Dict[str, Any]):
+        self.on_event("GUILD_MEMBER_UPDATE", {"guild_id": str(g.id), **member})
+
+    async def edit_member(self, request, body, gid, uid):
+        g = self.guilds[int(gid)]
+        member = g.members.get(int(uid))
+        if not member:
+            return self._not_found("Member", 10007)
+        if "roles" in body:
+            member["roles"] = [str(r) for r in body["roles"]]
+        if "nick" in body:
+            member["nick"] = body["nick"]
+        self._member_changed(g, member)
+        return 200, member
+
+    async def add_member_role(self, request, body, gid, uid, rid):
+        g = self.guilds[int(gid)]
+        member = g.members.get(int(uid))
+        if not member:
+            return self._not_found("Member", 10007)
+        if rid not in member["roles"]:
+            member["roles"].append(rid)
+            self._member_changed(g, member)
+        return 204, None
+
+    async def remove_member_role(self, request, body, gid, uid, rid):
+        g = self.guilds[int(gid)]
+        member = g.members.get(int(uid))
+        if not member:
+            return self._not_found("Member", 10007)
+        if rid in member["roles"]:
+            member["roles"].remove(rid)
+            self._member_changed(g, member)
+        return 204, None
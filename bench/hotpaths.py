@@ -0,0 +1,186 @@
+# bench/hotpaths.py
+"""Benchmarks for the storage, leaderboard and approval data paths.
+
+Builds synthetic wr_data datasets in a temp directory and times the real
+code paths against fake guilds, so it needs no network or Discord token:
+
+    python -m bench.hotpaths                               # 1k, 100k and 1M records
+    python -m bench.hotpaths --sizes 1k,100k --out new.json --baseline old.json
+
+Each case reports ops/sec, p50/p99 latency and the tracemalloc peak of one
+extra run. WR_STORAGE picks the backend as it does for the bot. The
+mutation queue's commit window is set to 0 so `approve` measures the data
+path rather than the batching delay.
+"""
+import os, sys, time, asyncio, argparse, itertools, tempfile, tracemalloc, inspect
+from typing import Dict, Any, List, Callable, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def parse_sizes(text: str) -> List[int]:
+    return [SIZES.get(s.strip().lower()) or int(s) for s in text.split(",") if s.strip()]
+
+
+def label(n: int) -> str:
+    for name, size in SIZES.items():
+        if size == n:
+            return name
+    return str(n)
+
+
+async def _call(fn: Callable[[], Any]):
+    res = fn()
+    if inspect.isawaitable(res):
+        res = await res
+    return res
+
+
+async def measure(fn: Callable[[], Any], setup: Optional[Callable[[], Any]] = None,
+                  min_time: float = 1.0, max_iters: int = 1000) -> Dict[str, Any]:
+    """Time `fn` until `min_time` seconds or `max_iters` runs, then one traced run for peak memory.
+
+    `setup` runs untimed before every call; if it returns False the case stops early.
+    """
+    samples: List[float] = []
+    spent = 0.0
+    while spent < min_time and len(samples) < max_iters:
+        if setup and await _call(setup) is False:
+            break
+        t0 = time.perf_counter()
+        await _call(fn)
+        dt = time.perf_counter() - t0
+        samples.append(dt)
+        spent += dt
+
+    peak = None
+    if not setup or await _call(setup) is not False:
+        tracemalloc.start()
+        await _call(fn)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    from .report import summarize
+    row = summarize(samples)
+    row["peak_kib"] = round(peak / 1024, 1) if peak is not None else None
+    return row
+
+
+async def run_size(n: int, args) -> Dict[str, Dict[str, Any]]:
+    from cogs import util
+    from cogs.approval import ApprovalView
+    from cogs.submission import SubmissionCog
+    from cogs.leaderboard import LeaderboardCog, WR_ROLE_THEME
+    from cogs.roles import sync_guild_roles
+    from .synth import make_dataset, players_by_guild, FakeGuild, FakeMessage, fake_interaction, fake_bot
+
+    # Fresh wr_data for this dataset, written through the configured backend
+    os.chdir(tempfile.mkdtemp(prefix=f"wr_bench_{label(n)}_", dir=args.workdir))
+    os.makedirs(util.DATA_DIR, exist_ok=True)
+    t0 = time.perf_counter()
+    data = make_dataset(n, guilds=args.guilds, seasons=args.seasons)
+    backend = util._subs_backend()
+    backend.save(data)
+    util.store.backends["subs"] = backend
+    util.store._writers["subs"] = util._Writer(backend, "subs", util.store._writers["subs"].snapshot)
+    util.store.reload()
+    util.wr_counts.built = util.category_index.built = False
+    util.name_cache._lru.clear()
+    print(f"[{label(n)}] dataset ready in {time.perf_counter() - t0:.1f}s "
+          f"({len(data['approved'])} approved, {len(data['pending'])} pending)", flush=True)
+
+    tiers = [name for (name, _m, _c, _i) in WR_ROLE_THEME["tiers"]]
+    pools = players_by_guild(data)
+    guilds = {gid: FakeGuild(gid, ids, tiers) for gid, ids in pools.items()}
+    guild = guilds[1]
+    del data
+
+    bot = fake_bot()
+    lb = LeaderboardCog(bot)
+    bot.cogs.update(SubmissionCog=SubmissionCog(bot), LeaderboardCog=lb)
+    opts = dict(min_time=args.min_time, max_iters=args.max_iters)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def case(name: str, row: Dict[str, Any]):
+        results[f"{name}@{label(n)}"] = row
+        print(f"[{label(n)}] {name}: {row}", flush=True)
+
+    # ---- storage ----
+    case("subs_load", await measure(lambda: util.subs(), setup=lambda: util.store.reload("subs"), **opts))
+    case("subs_get", await measure(util.subs, **opts))
+    case("save_subs", await measure(lambda: util.save_subs(util.subs()), **opts))
+
+    # ---- indexes ----
+    def rebuild():
+        util.wr_counts.rebuild(util.subs().get("approved", []))
+        util.category_index.rebuild(util.subs())
+    case("index_rebuild", await measure(rebuild, **opts))
+
+    cats = [(gid, metric, mode, size)
+            for gid in guilds for metric in ("time", "damage")
+            for mode, size in (("Solo", 1), ("Team", 2), ("Team", 3), ("Team", 4))]
+    it = itertools.cycle(cats)
+    case("leaderboard_slice", await measure(lambda: util.leaderboard_slice(*next(it)), **opts))
+    case("guild_wr_counts", await measure(lambda: lb._guild_wr_counts(guild), **opts))
+
+    # ---- leaderboard rendering ----
+    case("leaderboard_pages_cold", await measure(lambda: lb.leaderboard_pages(guild),
+                                                 setup=lambda: lb._rendered.clear(), **opts))
+    case("leaderboard_embed", await measure(lambda: lb.leaderboard_embed(guild), **opts))
+
+    # ---- prestige/badge roles: the first run assigns them, later runs only diff ----
+    case("prestige_sync", await measure(lambda: sync_guild_roles(guild), **opts))
+
+    # ---- approval: the ApprovalView.approve button, end to end against fakes ----
+    view = ApprovalView(bot)
+    pending = [(rec["guild_id"], rec["pending_message_id"]) for rec in list(util.subs()["pending"])]
+    queue = iter(pending)
+    current: Dict[str, Any] = {}
+
+    def next_pending():
+        nxt = next(queue, None)
+        if nxt is None:
+            return False
+        g = guilds[nxt[0]]
+        current["i"] = fake_interaction(g, g.members[0], FakeMessage(g, nxt[1]))
+
+    case("approve", await measure(lambda: view.approve.callback(current["i"]), setup=next_pending, **opts))
+    return results
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1k,100k,1m", help="comma-separated record counts (1k, 100k, 1m or numbers)")
+    ap.add_argument("--guilds", type=int, default=20)
+    ap.add_argument("--seasons", type=int, default=3)
+    ap.add_argument("--min-time", type=float, default=1.0, help="seconds to spend timing each case")
+    ap.add_argument("--max-iters", type=int, default=1000)
+    ap.add_argument("--workdir", default=None, help="where the temp wr_data dirs go (default: system temp)")
+    ap.add_argument("--out", default="bench_report.json")
+    ap.add_argument("--baseline", help="earlier report to compare p50 latency against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="fractional slowdown that counts as a regression")
+    args = ap.parse_args(argv)
+    out = os.path.abspath(args.out)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    # cogs.util creates wr_data/ relative to the cwd on import; keep it out of the repo
+    os.chdir(tempfile.mkdtemp(prefix="wr_bench_", dir=args.workdir))
+
+    from .report import write_report, print_table, compare
+    results: Dict[str, Dict[str, Any]] = {}
+    for n in parse_sizes(args.sizes):
+        results.update(await run_size(n, args))
+
+    print()
+    print_table(results, ["ops_per_sec", "p50_ms", "p99_ms", "peak_kib"])
+    write_report(out, results, storage=os.getenv("WR_STORAGE", "json"), guilds=args.guilds, seasons=args.seasons)
+    print(f"\nWrote {out}")
+    if baseline:
+        return 1 if compare(results, baseline, threshold=args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("WR_COMMIT_WINDOW", "0")
+    sys.path.insert(0, ROOT)
+    sys.exit(asyncio.run(main()))
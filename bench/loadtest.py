@@ -0,0 +1,358 @@
+# bench/loadtest.py
+"""End-to-end load test of the submission, approval and leaderboard flows.
+
+Runs the real Bot from bot.py against bench.fake_discord, a local stand-in
+for Discord's REST API, with hundreds of simulated users clicking buttons
+concurrently. No token or network access is needed:
+
+    python -m bench.loadtest --users 200 --guilds 2
+    python -m bench.loadtest --rate-limit 5/1 --chaos 0.02 --out new.json --baseline old.json
+
+Interactions are fed through the gateway parser (INTERACTION_CREATE), so
+they reach views and modals exactly as they would in production. The
+driver reads each response's components from the fake server, like a real
+client, to decide what to click next. Reports per-interaction latency
+percentiles (until the first response, and until the handler returns),
+REST calls per interaction and rate-limit hits, per scenario.
+"""
+import os, sys, time, random, asyncio, argparse, logging, tempfile, contextvars
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The interaction whose handler is running; inherited by every task it spawns
+CURRENT: "contextvars.ContextVar[Optional[Stat]]" = contextvars.ContextVar("wr_loadtest_interaction", default=None)
+
+
+class Stat:
+    def __init__(self, scenario: str, label: str):
+        self.scenario = scenario
+        self.label = label
+        self.ack: Optional[float] = None
+        self.done: Optional[float] = None
+        self.calls = 0
+        self.limited = 0
+        self.error: Optional[str] = None
+
+
+def http_trace(trace: Optional[aiohttp.TraceConfig] = None) -> aiohttp.TraceConfig:
+    """Counts each REST request (and 429) against the interaction that caused it.
+
+    Hooks are added to `trace` when given, so the bot's own perf counters keep working.
+    """
+    trace = trace or aiohttp.TraceConfig()
+
+    async def on_end(session, ctx, params):
+        stat = CURRENT.get()
+        if stat is not None:
+            stat.calls += 1
+            if params.response.status == 429:
+                stat.limited += 1
+
+    trace.on_request_end.append(on_end)
+    return trace
+
+
+def track_handlers(waiters: Dict[int, asyncio.Future]):
+    """Resolve waiters[interaction.id] when a view item or modal callback finishes."""
+    import discord
+
+    def wrap(orig):
+        async def run(self, *args):
+            interaction = next(a for a in args if isinstance(a, discord.Interaction))
+            try:
+                return await orig(self, *args)
+            finally:
+                fut = waiters.pop(interaction.id, None)
+                if fut and not fut.done():
+                    fut.set_result(None)
+        return run
+
+    discord.ui.View._scheduled_task = wrap(discord.ui.View._scheduled_task)
+    discord.ui.Modal._scheduled_task = wrap(discord.ui.Modal._scheduled_task)
+
+
+def _components(msg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [c for row in msg.get("components") or [] for c in row.get("components", [])]
+
+
+def _find(msg: Dict[str, Any], **match) -> Dict[str, Any]:
+    for c in _components(msg):
+        if all(c.get(k) == v for k, v in match.items()):
+            return c
+    raise LookupError(f"No component matching {match} on message {msg.get('id')}")
+
+
+class Driver:
+    def __init__(self, bot, server, timeout: float):
+        self.bot = bot
+        self.server = server
+        self.timeout = timeout
+        self.stats: List[Stat] = []
+        self.waiters: Dict[int, asyncio.Future] = {}
+        self.scenario = "setup"
+
+    # ------------------------- plumbing -------------------------
+    async def interact(self, label: str, guild, user_id: int, kind: int, data: Dict[str, Any],
+                       message: Optional[Dict[str, Any]] = None, channel_id: Optional[int] = None) -> int:
+        """Send one interaction through the gateway parser and wait for its handler. Returns its id."""
+        from .fake_discord import APP_ID, snowflake, member_payload
+        iid = snowflake()
+        channel_id = int(message["channel_id"]) if message else channel_id
+        member = {**member_payload(user_id, guild.members[user_id]["roles"]), "permissions": "8"}
+        payload = {
+            "id": str(iid), "application_id": str(APP_ID), "type": kind, "token": f"tok-{iid}", "version": 1,
+            "guild_id": str(guild.id), "channel_id": str(channel_id), "channel": {"id": str(channel_id), "type": 0},
+            "member": member, "data": data, "locale": "en-US", "app_permissions": "8",
+        }
+        if message:
+            payload["message"] = message
+        self.server.context[iid] = (channel_id, int(message["id"]) if message else None)
+
+        stat = Stat(self.scenario, label)
+        self.stats.append(stat)
+        fut = self.waiters[iid] = asyncio.get_running_loop().create_future()
+        token = CURRENT.set(stat)
+        started = time.monotonic()
+        try:
+            self.bot._connection.parse_interaction_create(payload)
+        finally:
+            CURRENT.reset(token)
+        try:
+            await asyncio.wait_for(fut, self.timeout)
+            stat.done = time.monotonic() - started
+        except asyncio.TimeoutError:
+            stat.error = "timeout"
+            self.waiters.pop(iid, None)
+        first = self.server.first_response.get(iid)
+        stat.ack = first - started if first else None
+        return iid
+
+    def responses(self, iid: int) -> List[Dict[str, Any]]:
+        return self.server.responses.get(iid, [])
+
+    def original(self, iid: int) -> Dict[str, Any]:
+        return self.server.originals[f"tok-{iid}"]
+
+    def panel(self, guild, channel: str, title: str) -> Dict[str, Any]:
+        cid = guild.channel_id(channel)
+        for msg in reversed(list(guild.messages[cid].values())):
+            if msg["embeds"] and msg["embeds"][0].get("title") == title:
+                return msg
+        raise LookupError(f"No {title!r} panel in #{channel}")
+
+    async def click(self, label: str, guild, user_id: int, message: Dict[str, Any], custom_id: str) -> int:
+        return await self.interact(label, guild, user_id, 3, {"custom_id": custom_id, "component_type": 2}, message)
+
+    async def select(self, label: str, guild, user_id: int, message: Dict[str, Any], custom_id: str,
+                     values: List[str]) -> int:
+        return await self.interact(label, guild, user_id, 3,
+                                   {"custom_id": custom_id, "component_type": 3, "values": values}, message)
+
+    async def pick_users(self, label: str, guild, user_id: int, message: Dict[str, Any], custom_id: str,
+                         ids: List[int]) -> int:
+        from .fake_discord import user_payload
+        resolved = {
+            "users": {str(i): user_payload(i) for i in ids},
+            "members": {str(i): {k: v for k, v in guild.members[i].items() if k != "user"} for i in ids},
+        }
+        data = {"custom_id": custom_id, "component_type": 5, "values": [str(i) for i in ids], "resolved": resolved}
+        return await self.interact(label, guild, user_id, 3, data, message)
+
+    async def submit_modal(self, label: str, guild, user_id: int, opened_by: int, values: List[str]) -> int:
+        modal = next(r["data"] for r in self.responses(opened_by) if r.get("type") == 9)
+        inputs = _components(modal)
+        rows = [{"type": 1, "components": [{"type": 4, "custom_id": c["custom_id"], "value": v}]}
+                for c, v in zip(inputs, values)]
+        channel_id = self.server.context[opened_by][0]
+        return await self.interact(label, guild, user_id, 5, {"custom_id": modal["custom_id"], "components": rows},
+                                   channel_id=channel_id)
+
+    # ------------------------- flows -------------------------
+    @staticmethod
+    def run_value(rng: random.Random, metric: str) -> str:
+        if metric == "Time":
+            ms = rng.randint(60_000, 3_600_000)
+            return f"{ms // 60_000}:{ms % 60_000 // 1000:02d}.{ms % 1000 // 10:02d}"
+        return f"{rng.randint(10_000, 50_000_000):,}"
+
+    async def submit_solo(self, guild, uid: int, rng: random.Random):
+        box = self.panel(guild, "wr-submissions", "[WR SUBMISSION BOX]")
+        iid = await self.click("submit.solo", guild, uid, box, "wr_submit_solo")
+        setup = self.original(iid)
+        metric = rng.choice(("Time", "Damage"))
+        iid = await self.click("submit.metric", guild, uid, setup, _find(setup, label=metric)["custom_id"])
+        await self.submit_modal("submit.modal", guild, uid, iid, [self.run_value(rng, metric), ""])
+
+    async def submit_team(self, guild, uid: int, rng: random.Random, players: List[int]):
+        box = self.panel(guild, "wr-submissions", "[WR SUBMISSION BOX]")
+        iid = await self.click("submit.team", guild, uid, box, "wr_submit_team")
+        setup = self.original(iid)
+        size = rng.randint(2, 4)
+        await self.select("submit.team_size", guild, uid, setup, "wr_team_size", [str(size)])
+        team = [uid] + rng.sample([p for p in players if p != uid], size - 1)
+        await self.pick_users("submit.players", guild, uid, setup, _find(setup, type=5)["custom_id"], team)
+        metric = rng.choice(("Time", "Damage"))
+        iid = await self.click("submit.metric", guild, uid, setup, _find(setup, label=metric)["custom_id"])
+        await self.submit_modal("submit.modal", guild, uid, iid, [self.run_value(rng, metric), "loadtest"])
+
+    async def approve_all(self, guild, moderator: int) -> int:
+        cid = guild.channel_id(self.bot.canonical_channels["pending"])
+        pending = [m for m in guild.messages[cid].values()
+                   if any(c.get("custom_id") == "wr_approve" for c in _components(m))]
+        await asyncio.gather(*(self.click("approve", guild, moderator, m, "wr_approve") for m in pending))
+        return len(pending)
+
+    async def browse_leaderboard(self, guild, uid: int, rng: random.Random):
+        panel = self.panel(guild, self.bot.canonical_channels["leaderboard"], "🏆 [WR LEADERBOARD]")
+        if rng.random() < 0.1:
+            await self.click("leaderboard.refresh", guild, uid, panel, "wr_lb_refresh")
+            return
+        iid = await self.click("leaderboard.open", guild, uid, panel, "wr_lb_next")
+        page = self.original(iid)
+        for _ in range(rng.randint(0, 3)):
+            await self.click("leaderboard.page", guild, uid, page, rng.choice(("wr_lb_next", "wr_lb_prev")))
+
+
+# ------------------------- reporting -------------------------
+def summarize(stats: List[Stat], calls: int, limited: int, wall: float) -> Dict[str, Any]:
+    from .report import percentile
+    done = [s.done for s in stats if s.done is not None]
+    ack = [s.ack for s in stats if s.ack is not None]
+    return {
+        "interactions": len(stats),
+        "errors": sum(1 for s in stats if s.error),
+        "p50_ms": round(percentile(done, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(done, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(done, 0.99) * 1000, 2),
+        "ack_p99_ms": round(percentile(ack, 0.99) * 1000, 2),
+        "rest_calls": calls,
+        "rest_per_interaction": round(calls / len(stats), 2) if stats else 0.0,
+        "rate_limited": limited,
+        "wall_s": round(wall, 2),
+    }
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    import discord
+    from .fake_discord import FakeDiscord, FakeGuildState, RateLimiter, snowflake
+    import bot as bot_module
+    from cogs import leaderboard
+
+    # bot.py turns on INFO logging when imported
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    if not args.verbose:
+        logging.getLogger("discord").setLevel(logging.ERROR)
+
+    channels = list(bot_module.bot.canonical_channels.values()) + ["wr-submissions"]
+    guilds = [FakeGuildState(snowflake(), f"Load Guild {n}", [snowflake() for _ in range(args.users)],
+                             channels, [bot_module.APPROVAL_ROLE]) for n in range(args.guilds)]
+    limiter = None
+    if args.rate_limit:
+        limit, per = args.rate_limit.split("/")
+        limiter = RateLimiter(int(limit), float(per), args.chaos)
+    server = FakeDiscord(guilds, limiter, rtt=args.rtt_ms / 1000)
+    discord.http.Route.BASE = await server.start()
+
+    waiters: Dict[int, asyncio.Future] = {}
+    track_handlers(waiters)
+    bot = bot_module.Bot()
+    bot.http.http_trace = http_trace(bot.http.http_trace)
+    await bot.login("loadtest-token")  # runs setup_hook: loads wr_data, cogs, command sync
+    state = bot._connection
+    server.on_event = lambda event, data: asyncio.get_running_loop().call_soon(state.parsers[event], data)
+    for g in guilds:
+        state._add_guild_from_data(g.payload())
+
+    driver = Driver(bot, server, args.timeout)
+    driver.waiters = waiters
+    quiet = leaderboard.REFRESH_DELAY + 0.5
+    results: Dict[str, Dict[str, Any]] = {}
+    rng = random.Random(args.seed)
+
+    async def scenario(name: str, work):
+        driver.scenario = name
+        mark, limited = len(server.calls), server.rate_limited
+        started = time.monotonic()
+        await work
+        await server.idle(quiet)
+        wall = time.monotonic() - started
+        stats = [s for s in driver.stats if s.scenario == name]
+        results[name] = summarize(stats, len(server.calls) - mark, server.rate_limited - limited, wall)
+        for label in sorted({s.label for s in stats}):
+            mine = [s for s in stats if s.label == label]
+            row = summarize(mine, sum(s.calls for s in mine), sum(s.limited for s in mine), wall)
+            results[f"{name}/{label}"] = row
+        print(f"[{name}] {results[name]}", flush=True)
+
+    async def staggered(coro_fn, items):
+        async def one(item):
+            await asyncio.sleep(rng.random() * args.ramp)
+            try:
+                await coro_fn(item)
+            except Exception as e:
+                logging.exception(f"Simulated user failed: {e}")
+        await asyncio.gather(*(one(i) for i in items))
+
+    await scenario("provision", asyncio.gather(*(bot.provision_guild(g) for g in bot.guilds)))
+
+    users = [(g, uid) for g in guilds for uid in list(g.members)[1:]]
+
+    async def submit(item):
+        g, uid = item
+        if rng.random() < args.team_ratio:
+            await driver.submit_team(g, uid, random.Random(uid), list(g.members)[1:])
+        else:
+            await driver.submit_solo(g, uid, random.Random(uid))
+    await scenario("submit", staggered(submit, users))
+
+    mods = {g.id: list(g.members)[1] for g in guilds}
+    await scenario("approve", asyncio.gather(*(driver.approve_all(g, mods[g.id]) for g in guilds)))
+
+    await scenario("leaderboard", staggered(lambda item: driver.browse_leaderboard(item[0], item[1], random.Random(item[1])),
+                                            users))
+    await bot.close()
+    await server.stop()
+    return results
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--users", type=int, default=200, help="simulated users per guild")
+    ap.add_argument("--guilds", type=int, default=1)
+    ap.add_argument("--team-ratio", type=float, default=0.25, help="share of users submitting team runs")
+    ap.add_argument("--ramp", type=float, default=1.0, help="seconds over which users start")
+    ap.add_argument("--rtt-ms", type=float, default=20.0, help="simulated latency per REST call")
+    ap.add_argument("--rate-limit", default="5/1", help="per-bucket limit as requests/seconds, or '' for none")
+    ap.add_argument("--chaos", type=float, default=0.0, help="chance of an extra 429 on any limited request")
+    ap.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for one interaction handler")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--out", default="loadtest_report.json")
+    ap.add_argument("--baseline", help="earlier report to compare p99 latency and REST calls against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="fractional increase that counts as a regression")
+    ap.add_argument("-v", "--verbose", action="store_true", help="show discord.py's own logging")
+    args = ap.parse_args(argv)
+    out = os.path.abspath(args.out)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    # The bot keeps wr_data/ relative to the cwd; give it a fresh one
+    os.chdir(tempfile.mkdtemp(prefix="wr_loadtest_"))
+
+    from .report import write_report, print_table, compare
+    results = await run(args)
+    print()
+    print_table(results, ["interactions", "p50_ms", "p99_ms", "ack_p99_ms", "rest_per_interaction", "rate_limited"])
+    write_report(out, results, users=args.users, guilds=args.guilds, rate_limit=args.rate_limit,
+                 chaos=args.chaos, rtt_ms=args.rtt_ms)
+    print(f"\nWrote {out}")
+    if baseline:
+        slower = compare(results, baseline, "p99_ms", args.threshold)
+        chattier = compare(results, baseline, "rest_per_interaction", args.threshold)
+        return 1 if slower or chattier else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,71 @@
+# bench/report.py
+# Percentiles, JSON reports and baseline comparison shared by the bench scripts.
+import json, platform, sys, time
+from typing import Dict, Any, List, Optional
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of `samples` (q in 0..1); 0.0 if empty."""
+    if not samples:
+        return 0.0
+    xs = sorted(samples)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """ops/sec and p50/p99/max in milliseconds for per-op durations in seconds."""
+    total = sum(samples)
+    return {
+        "n": len(samples),
+        "ops_per_sec": round(len(samples) / total, 2) if total else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+        "max_ms": round(max(samples) * 1000, 4) if samples else 0.0,
+    }
+
+
+def write_report(path: str, results: Dict[str, Dict[str, Any]], **meta):
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            **meta,
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: List[str]):
+    width = max([len(k) for k in results] + [4])
+    print(f"{'case':<{width}}  " + "  ".join(f"{c:>12}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<{width}}  " + "  ".join(f"{_cell(row.get(c)):>12}" for c in columns))
+
+
+def _cell(value: Any) -> str:
+    return "-" if value is None else str(value)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline_path: str, metric: str = "p50_ms",
+            threshold: float = 0.25) -> List[str]:
+    """Print `metric` against a saved report and return the cases that got slower than `threshold`."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = json.load(f).get("results", {})
+    regressions = []
+    print(f"\nvs {baseline_path} ({metric}, flagging > {threshold:.0%} slower):")
+    for name, row in results.items():
+        old: Optional[float] = base.get(name, {}).get(metric)
+        new = row.get(metric)
+        if old is None or new is None:
+            print(f"  {name}: no baseline")
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  <-- regression"
+            regressions.append(name)
+        print(f"  {name}: {old} -> {new} ({change:+.1%}){flag}")
+    return regressions
@@ -0,0 +1,202 @@
+# bench/synth.py
+# Synthetic wr_data datasets and stand-ins for the discord.py objects the cogs touch.
+import random
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+TIME_RANGE_MS = (60_000, 3_600_000)
+DAMAGE_RANGE = (10_000, 50_000_000)
+
+
+def _fmt_time(ms: int) -> str:
+    m, rest = divmod(ms, 60_000)
+    return f"{m}:{rest // 1000:02d}.{rest % 1000 // 10:02d}"
+
+
+def make_record(rng: random.Random, guild_id: int, players: List[int], season: int) -> Dict[str, Any]:
+    size = rng.choice((1, 1, 1, 2, 3, 4))
+    team = rng.sample(players, min(size, len(players)))
+    metric = rng.choice(("time", "damage"))
+    if metric == "time":
+        num = rng.randint(*TIME_RANGE_MS)
+        value = _fmt_time(num)
+    else:
+        num = rng.randint(*DAMAGE_RANGE)
+        value = f"{num:,}"
+    return {
+        "guild_id": guild_id,
+        "submitter_id": team[0],
+        "mode": "Solo" if len(team) == 1 else "Team",
+        "size": len(team),
+        "players": team,
+        "metric": metric,
+        "value": value,
+        "value_num": num,
+        "notes": None,
+        "season": season,
+        "submission_id": f"{rng.getrandbits(128):032x}",
+    }
+
+
+def make_dataset(n: int, guilds: int = 20, seasons: int = 3, pending_ratio: float = 0.05,
+                 seed: int = 1234) -> Dict[str, Any]:
+    """A submissions dict with `n` records spread over `guilds` and `seasons`.
+
+    About `pending_ratio` of them are pending, each with a unique
+    pending_message_id; the rest are approved. Player pools scale with `n`
+    so big datasets also have long leaderboards.
+    """
+    rng = random.Random(seed)
+    per_guild = max(10, n // (guilds * 4))
+    pools = {gid: [gid * 10_000_000 + p for p in range(per_guild)] for gid in guild_ids(guilds)}
+    data: Dict[str, Any] = {"pending": [], "approved": [], "records": []}
+    next_msg = 1
+    for i in range(n):
+        gid = 1 + i % guilds
+        rec = make_record(rng, gid, pools[gid], 1 + rng.randrange(seasons))
+        if rng.random() < pending_ratio:
+            rec["pending_message_id"] = next_msg
+            next_msg += 1
+            data["pending"].append(rec)
+        else:
+            data["approved"].append(rec)
+    return data
+
+
+def guild_ids(guilds: int) -> List[int]:
+    return list(range(1, guilds + 1))
+
+
+def players_by_guild(data: Dict[str, Any]) -> Dict[int, List[int]]:
+    seen: Dict[int, set] = {}
+    for key in ("pending", "approved", "records"):
+        for rec in data.get(key, []):
+            seen.setdefault(rec["guild_id"], set()).update(rec["players"])
+    return {gid: sorted(ids) for gid, ids in seen.items()}
+
+
+# ------------------------- fakes -------------------------
+class FakeRole:
+    def __init__(self, guild: "FakeGuild", rid: int, name: str, position: int = 1):
+        self.guild = guild
+        self.id = rid
+        self.name = name
+        self.position = position
+
+    @property
+    def members(self) -> List["FakeMember"]:
+        return [m for m in self.guild.members if self in m.roles]
+
+    def is_default(self) -> bool:
+        return self.name == "@everyone"
+
+    async def edit(self, **kwargs):
+        self.guild.calls.append(("role.edit", self.id))
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", uid: int, name: str, roles: Optional[List[FakeRole]] = None):
+        self.guild = guild
+        self.id = uid
+        self.display_name = name
+        self.roles = roles or [guild.default_role]
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def get_role(self, rid: int) -> Optional[FakeRole]:
+        return next((r for r in self.roles if r.id == rid), None)
+
+    async def edit(self, roles: Optional[List[FakeRole]] = None, **kwargs):
+        self.guild.calls.append(("member.edit", self.id))
+        if roles is not None:
+            self.roles = [self.guild.default_role] + [r for r in roles if not r.is_default()]
+
+
+class FakeGuild:
+    """Just enough of discord.Guild for the leaderboard, role and approval paths.
+
+    Every mutating call is appended to `calls` so a run can count them.
+    """
+
+    def __init__(self, gid: int, member_ids: List[int], role_names: List[str] = ()):
+        self.id = gid
+        self.name = f"Guild {gid}"
+        self.calls: List[tuple] = []
+        self.default_role = FakeRole(self, gid, "@everyone", 0)
+        self.roles: List[FakeRole] = [self.default_role]
+        for n, name in enumerate(role_names, start=1):
+            self.roles.append(FakeRole(self, gid * 1000 + n, name, n))
+        self.me = FakeMember(self, 0, "WR Bot", [self.default_role])
+        self.me.roles.append(FakeRole(self, gid * 1000 + 999, "WR Bot", len(self.roles) + 1))
+        self.members = [FakeMember(self, uid, f"Player {uid}") for uid in member_ids]
+        self._by_id = {m.id: m for m in self.members}
+        self.text_channels: List[Any] = []
+
+    def get_member(self, uid: int) -> Optional[FakeMember]:
+        return self._by_id.get(uid)
+
+    def get_role(self, rid: int) -> Optional[FakeRole]:
+        return next((r for r in self.roles if r.id == rid), None)
+
+    def get_channel(self, cid: int) -> Optional[Any]:
+        return next((c for c in self.text_channels if c.id == cid), None)
+
+    async def create_role(self, name: str, **kwargs) -> FakeRole:
+        self.calls.append(("create_role", name))
+        role = FakeRole(self, self.id * 1000 + len(self.roles), name, 1)
+        self.roles.append(role)
+        return role
+
+
+class _Response:
+    def __init__(self, calls: List[tuple]):
+        self.calls = calls
+
+    async def defer(self, **kwargs):
+        self.calls.append(("response.defer",))
+
+    async def send_message(self, *args, **kwargs):
+        self.calls.append(("response.send_message",))
+
+    async def edit_message(self, **kwargs):
+        self.calls.append(("response.edit_message",))
+
+    async def send_modal(self, modal):
+        self.calls.append(("response.send_modal",))
+
+
+class _Followup:
+    def __init__(self, calls: List[tuple]):
+        self.calls = calls
+
+    async def send(self, *args, **kwargs):
+        self.calls.append(("followup.send",))
+
+
+class FakeMessage:
+    def __init__(self, guild: FakeGuild, mid: int):
+        self.guild = guild
+        self.id = mid
+        self.embeds: List[Any] = []
+        self.flags = SimpleNamespace(ephemeral=False)
+
+    async def edit(self, **kwargs):
+        self.guild.calls.append(("message.edit", self.id))
+        return self
+
+
+def fake_interaction(guild: FakeGuild, user: FakeMember, message: Optional[FakeMessage] = None) -> SimpleNamespace:
+    """An interaction on `message` that records its responses in guild.calls."""
+    return SimpleNamespace(
+        guild=guild, guild_id=guild.id, user=user, message=message,
+        response=_Response(guild.calls), followup=_Followup(guild.calls),
+    )
+
+
+def fake_bot(**cogs) -> SimpleNamespace:
+    bot = SimpleNamespace(brand_prefix="[WR BOT]", theme_color=0x0A0A23, cogs=cogs,
+                          canonical_channels={"pending": "wr-pending", "leaderboard": "wr-leaderboard"})
+    bot.get_cog = lambda name: bot.cogs.get(name)
+    return bot
@@ -3,15 +3,20 @@
 # Python 3.11+, discord.py 2.x
 
 import os
+import json
+import time
+import hashlib
+import asyncio
 import logging
 import discord
 from discord.ext import commands
+from cogs.util import store, command_sync_state, save_command_sync_state
+from cogs.metrics import perf
 
 logging.basicConfig(level=logging.INFO)
 
 INTENTS = discord.Intents.default()
 INTENTS.members = True
-INTENTS.message_content = True
 
 APPROVAL_ROLE = "Abyssal Warden"
 BRAND_PREFIX = "[WR BOT]"
@@ -24,9 +29,18 @@ CHAN_LEADER = "wr-leaderboard"
 CHAN_INFO = "bot-commands-info"
 CHAN_SCREEN = "wr-screenshots"
 
+# Dev mode: sync commands to this one guild only (instant) instead of globally
+GUILD_LIMIT = os.getenv("GUILD_LIMIT")
+# Set to 1 to sync the command tree even if it hasn't changed
+FORCE_SYNC = os.getenv("FORCE_SYNC") == "1"
+
+# How many guilds to provision at once on startup
+PROVISION_CONCURRENCY = int(os.getenv("PROVISION_CONCURRENCY", "5"))
+
 class Bot(commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix="!", help_command=None, intents=INTENTS)
+        # http_trace feeds per-route REST counters into perf (see /wr-perf)
+        super().__init__(command_prefix="!", help_command=None, intents=INTENTS, http_trace=perf.trace_config())
         self.theme_color = THEME_COLOR
         self.brand_prefix = BRAND_PREFIX
         self.approval_role_name = APPROVAL_ROLE
@@ -37,17 +51,52 @@ class Bot(commands.Bot):
             "info": CHAN_INFO,
             "screens": CHAN_SCREEN,
         }
+        # guild id -> seconds its provisioning took; guilds in here are skipped on reconnect
+        self.provisioned = {}
+        self._provisioning = set()
 
     async def setup_hook(self):
+        # Parse wr_data/*.json off the event loop before anything reads it
+        await store.load_async()
+
         # Load cogs
-        for ext in ("cogs.events", "cogs.info", "cogs.submission", "cogs.approval", "cogs.leaderboard"):
+        started = time.perf_counter()
+        for ext in ("cogs.events", "cogs.info", "cogs.submission", "cogs.approval", "cogs.leaderboard", "cogs.perf"):
             try:
                 await self.load_extension(ext)
                 logging.info(f"Loaded {ext}")
             except Exception as e:
                 logging.exception(f"Failed to load {ext}: {e}")
-        await self.tree.sync()
-        logging.info("Application commands synced.")
+        loaded = time.perf_counter()
+        synced = await self.sync_commands()
+        perf.observe("startup", "load_extensions", loaded - started)
+        perf.observe("startup", "command_sync", time.perf_counter() - loaded)
+        logging.info(
+            f"Extensions loaded in {loaded - started:.2f}s; "
+            f"command sync {'took' if synced else 'skipped (unchanged) in'} {time.perf_counter() - loaded:.2f}s."
+        )
+
+    async def sync_commands(self) -> bool:
+        """Sync the app-command tree only if it changed since the last sync.
+
+        The fingerprint is a hash of the serialized commands, stored per scope
+        ("global", or the GUILD_LIMIT guild id) in wr_data/command_sync.json.
+        Returns True if a sync was sent to Discord.
+        """
+        guild = discord.Object(id=int(GUILD_LIMIT)) if GUILD_LIMIT else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+        commands_json = sorted((c.to_dict() for c in self.tree.get_commands(guild=guild)), key=lambda c: (c.get("type", 1), c["name"]))
+        fingerprint = hashlib.sha256(json.dumps(commands_json, sort_keys=True).encode()).hexdigest()
+
+        scope = str(guild.id) if guild else "global"
+        state = command_sync_state()
+        if state.get(scope) == fingerprint and not FORCE_SYNC:
+            return False
+        await self.tree.sync(guild=guild)
+        state[scope] = fingerprint
+        await save_command_sync_state(state)
+        return True
 
     async def ensure_role_and_channels(self, guild: discord.Guild):
         # Role
@@ -122,19 +171,58 @@ class Bot(commands.Bot):
         await get_or_create_pending(CHAN_PENDING)
         await get_or_create_open(CHAN_SCREEN)
 
+    async def provision_guild(self, guild: discord.Guild):
+        """Create roles/channels and post the panels, once per guild per process."""
+        if guild.id in self.provisioned or guild.id in self._provisioning:
+            return
+        self._provisioning.add(guild.id)
+        started = time.perf_counter()
+        try:
+            await self.ensure_role_and_channels(guild)
+            try:
+                # Forced: a panel deleted while the bot was offline still has a matching pin
+                await self.get_cog("InfoCog").post_or_update_help(guild, force=True)
+                await self.get_cog("SubmissionCog").post_or_update_submission_box(guild, force=True)
+                await self.get_cog("LeaderboardCog").post_or_update_leaderboard_box(guild, force=True)
+            except Exception as e:
+                # Not marked provisioned, so the next on_ready tries again
+                logging.exception(f"Startup posting in {guild.name} failed: {e}")
+                return
+            self.provisioned[guild.id] = time.perf_counter() - started
+            perf.observe("startup", "provision_guild", self.provisioned[guild.id])
+        finally:
+            self._provisioning.discard(guild.id)
+
+    async def provision_all(self):
+        sem = asyncio.Semaphore(PROVISION_CONCURRENCY)
+        todo = [g for g in self.guilds if g.id not in self.provisioned]
+
+        async def one(g: discord.Guild):
+            async with sem:
+                try:
+                    await self.provision_guild(g)
+                except Exception as e:
+                    logging.exception(f"Provisioning {g.name} failed: {e}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(g) for g in todo))
+        done = [g for g in todo if g.id in self.provisioned]
+        if done:
+            slowest = max(done, key=lambda g: self.provisioned[g.id])
+            logging.info(
+                f"Provisioned {len(done)} guild(s) in {time.perf_counter() - started:.1f}s "
+                f"(slowest: {slowest.name} {self.provisioned[slowest.id]:.1f}s)"
+            )
+        if len(done) < len(todo):
+            logging.warning(f"{len(todo) - len(done)} guild(s) failed to provision; retrying on the next reconnect")
+
 bot = Bot()
 
 @bot.event
 async def on_ready():
-    # Ensure resources in all guilds
-    for g in bot.guilds:
-        await bot.ensure_role_and_channels(g)
-        try:
-            await bot.get_cog("InfoCog").post_or_update_help(g)
-            await bot.get_cog("SubmissionCog").post_or_update_submission_box(g)
-            await bot.get_cog("LeaderboardCog").post_or_update_leaderboard_box(g)
-        except Exception as e:
-            logging.exception(f"Startup posting in {g.name} failed: {e}")
+    # Ensure resources in all guilds (on_ready fires again after reconnects;
+    # guilds already provisioned by this process are skipped)
+    await bot.provision_all()
     logging.info(f"Logged in as: {bot.user} (ID: {bot.user.id})")
 
 def main():
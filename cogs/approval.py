@@ -3,7 +3,8 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from typing import Optional
-from .util import subs, save_subs
+from .util import approve_pending, reject_pending
+from .metrics import timed
 
 APPROVAL_TITLE = "[WR PENDING APPROVAL]"
 
@@ -14,25 +15,16 @@ class ApprovalView(discord.ui.View):
         self.bot = bot
 
     @discord.ui.button(label="✅ Approve", style=discord.ButtonStyle.success, custom_id="wr_approve")
+    @timed("wr_approve")
     async def approve(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(ephemeral=True, thinking=True)
 
-        # Load record from pending list
-        data = subs()
-        rec = None
-        for r in data.get("pending", []):
-            if r.get("pending_message_id") == interaction.message.id:
-                rec = r
-                break
+        # Move record pending → approved (atomic; a second click finds nothing)
+        rec = await approve_pending(interaction.message.id)
         if not rec:
             await interaction.followup.send(f"{self.bot.brand_prefix} Could not find the pending record.", ephemeral=True)
             return
 
-        # Move record → approved
-        data["pending"].remove(rec)
-        data.setdefault("approved", []).append(rec)
-        save_subs(data)
-
         # Update embed
         from .submission import SubmissionCog
         cog: SubmissionCog = self.bot.get_cog("SubmissionCog")
@@ -44,29 +36,21 @@ class ApprovalView(discord.ui.View):
         if lb:
             for pid in rec.get("players", []):
                 await lb.recompute_and_apply_for_member(interaction.guild, pid)
-            await lb.post_or_update_leaderboard_box(interaction.guild)
+            lb.schedule_refresh(interaction.guild)
 
         await interaction.followup.send(f"{self.bot.brand_prefix} ✅ Approved and roles updated.", ephemeral=True)
 
     @discord.ui.button(label="❌ Reject", style=discord.ButtonStyle.danger, custom_id="wr_reject")
+    @timed("wr_reject")
     async def reject(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(ephemeral=True, thinking=True)
 
-        # Load record from pending list
-        data = subs()
-        rec = None
-        for r in data.get("pending", []):
-            if r.get("pending_message_id") == interaction.message.id:
-                rec = r
-                break
+        # Remove record from pending list
+        rec = await reject_pending(interaction.message.id)
         if not rec:
             await interaction.followup.send(f"{self.bot.brand_prefix} Could not find the pending record.", ephemeral=True)
             return
 
-        # Remove record
-        data["pending"].remove(rec)
-        save_subs(data)
-
         # Update message
         await interaction.message.edit(content=f"{self.bot.brand_prefix} ❌ Rejected.", embed=None, view=None)
         await interaction.followup.send(f"{self.bot.brand_prefix} ❌ Submission rejected.", ephemeral=True)
@@ -1,7 +1,7 @@
 # cogs/events.py
 import discord
 from discord.ext import commands
-from .util import set_channel_id, get_channel_id
+from .util import channel_map, role_cache, name_cache, forget_panel_messages, forget_panel_channel
 
 class EventsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -9,11 +9,68 @@ class EventsCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_guild_available(self, guild: discord.Guild):
-        # Capture channel ids into cfg for quick lookup
-        for key, name in self.bot.canonical_channels.items():
-            ch = discord.utils.get(guild.text_channels, name=name)
-            if ch:
-                set_channel_id(guild.id, key, ch.id)
+        # Capture channel ids into cfg for quick lookup; unchanged ids aren't
+        # rewritten and changes from every guild share one delayed save
+        by_name = {}
+        for ch in guild.text_channels:
+            by_name.setdefault(ch.name, ch)  # first match wins, like discord.utils.get
+        ids = {key: by_name[name].id for key, name in self.bot.canonical_channels.items() if name in by_name}
+        channel_map.update(guild.id, ids)
+
+    # Stored channel ids must not outlive the channel or its canonical name
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.name != after.name:
+            channel_map.forget(after.guild.id, after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        channel_map.forget(channel.guild.id, channel.id)
+        await forget_panel_channel(channel.guild.id, channel.id)
+
+    # Role lookups are cached per guild; any role change drops that guild's cache
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        role_cache.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        role_cache.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        role_cache.invalidate(role.guild.id)
+
+    # Leaderboard display names are cached per guild; keep them current
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.display_name != after.display_name:
+            name_cache.update(after.guild.id, after.id, after.display_name)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if before.display_name != after.display_name:
+            name_cache.forget_user(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        name_cache.joined(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        await name_cache.departed(member)
+
+    # Panels skip edits whose content hasn't changed, so a deleted panel must
+    # be forgotten or it would never be reposted
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id:
+            await forget_panel_messages(payload.guild_id, [payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if payload.guild_id:
+            await forget_panel_messages(payload.guild_id, payload.message_ids)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(EventsCog(bot))
@@ -2,6 +2,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from .util import upsert_panel, channel_map
 
 HELP_MARKER = "[WR COMMANDS]"
 
@@ -9,8 +10,8 @@ class InfoCog(commands.Cog, name="InfoCog"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    async def post_or_update_help(self, guild: discord.Guild):
-        ch = discord.utils.get(guild.text_channels, name=self.bot.canonical_channels["info"])
+    async def post_or_update_help(self, guild: discord.Guild, force: bool = False):
+        ch = channel_map.resolve(guild, "info", self.bot.canonical_channels["info"])
         if not ch: return
         embed = discord.Embed(
             title=HELP_MARKER,
@@ -27,11 +28,7 @@ class InfoCog(commands.Cog, name="InfoCog"):
             color=self.bot.theme_color
         )
         embed.set_footer(text="WR Bot — Command Index")
-        async for m in ch.history(limit=50):
-            if m.author == guild.me and m.embeds and m.embeds[0].title == HELP_MARKER:
-                await m.edit(embed=embed)
-                return
-        await ch.send(embed=embed)
+        await upsert_panel(guild, ch, "help", HELP_MARKER, force=force, embed=embed)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(InfoCog(bot))
@@ -0,0 +1,94 @@
+# cogs/journal.py
+# Snapshot + append-only op journal for submissions (WR_STORAGE=journal).
+import os, json, logging
+from typing import Dict, Any, List, Callable
+
+SEQ_KEY = "_journal_seq"
+
+
+class JournalBackend:
+    """Stores submissions as a JSON snapshot plus a JSON-lines journal of ops.
+
+    Each group commit appends one line per op ({"seq": n, "op": {...}}), so
+    the cost of a write doesn't grow with history. load() reads the snapshot
+    and replays journal lines newer than the snapshot's seq, cutting off a
+    torn last line so later appends start on a clean line. save() is
+    compaction: it writes a fresh snapshot atomically, then truncates the
+    journal. A crash between the two just replays nothing extra, since the
+    snapshot records the last seq it covers.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str, default: Callable[[], Any],
+                 apply: Callable[[Dict[str, Any], Dict[str, Any]], Any],
+                 fsync: bool = True, compact_bytes: int = 8 * 1024 * 1024):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.default = default
+        self.apply = apply
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.seq = 0
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = self.default()
+        self.seq = data.pop(SEQ_KEY, 0)
+        if os.path.exists(self.journal_path):
+            good = 0  # bytes up to the end of the last complete line
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn tail from a crash mid-append
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    if entry["seq"] <= self.seq:
+                        continue
+                    self.apply(data, entry["op"])
+                    self.seq = entry["seq"]
+            self._truncate(good)
+        return data
+
+    def _truncate(self, size: int):
+        """Drop everything after `size` bytes; appending onto a torn line would hide every later op."""
+        extra = os.path.getsize(self.journal_path) - size
+        if extra <= 0:
+            return
+        logging.warning(f"Dropping {extra} byte(s) of torn journal tail from {self.journal_path}")
+        with open(self.journal_path, "r+b") as f:
+            f.truncate(size)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, ops: List[Dict[str, Any]]):
+        lines = []
+        for op in ops:
+            self.seq += 1
+            lines.append(json.dumps({"seq": self.seq, "op": op}, separators=(",", ":")))
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def save(self, data: Dict[str, Any]):
+        """Compact: snapshot `data` (which must include every journaled op), then reset the journal."""
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**data, SEQ_KEY: self.seq}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+
+    def needs_compaction(self) -> bool:
+        try:
+            return os.path.getsize(self.journal_path) > self.compact_bytes
+        except OSError:
+            return False
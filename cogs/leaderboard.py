@@ -1,9 +1,13 @@
 # cogs/leaderboard.py
+import os
+import re
+import time
 import discord
 from discord.ext import commands
 from discord import app_commands
 from typing import Dict, List, Tuple, Optional
-from .util import subs
+from .util import store, subs, wr_counts, category_index, name_cache, upsert_panel, RefreshScheduler, role_cache, desired_roles, reconcile_roles, channel_map
+from .metrics import timed
 
 # ---- Role Tier Config (lowered thresholds: 1,2,3,4) ----
 WR_ROLE_THEME = {
@@ -18,7 +22,11 @@ WR_ROLE_THEME = {
 
 LEADERBOARD_TITLE = "🏆 [WR LEADERBOARD]"
 LEADERBOARD_CHANNEL_NAME = "wr-leaderboard"
-MAX_ROWS = 50  # how many lines to show
+PAGE_SIZE = 20  # rows per leaderboard page
+PAGE_CHARS = 4000  # stay under Discord's 4096-char embed description limit
+REFRESH_DELAY = float(os.getenv("LB_REFRESH_DELAY", "2.0"))  # seconds to coalesce refresh requests
+ROLE_SYNC_CONCURRENCY = int(os.getenv("ROLE_SYNC_CONCURRENCY", "4"))  # parallel member edits in bulk syncs
+PROGRESS_EVERY = 5.0  # seconds between progress updates to the invoking admin
 
 
 def tier_for_count(wr_count: int) -> Optional[Tuple[str, str]]:
@@ -38,26 +46,77 @@ def role_order_map() -> Dict[str, int]:
     return order
 
 
+def _page_of(message: Optional[discord.Message]) -> int:
+    """Page number shown in a leaderboard message's footer (1 if none)."""
+    try:
+        return int(re.search(r"Page (\d+)/", message.embeds[0].footer.text).group(1))
+    except Exception:
+        return 1
+
+
+class LeaderboardJump(discord.ui.Modal, title="Jump to page"):
+    page = discord.ui.TextInput(label="Page number", placeholder="1", max_length=6)
+
+    def __init__(self, cog: "LeaderboardCog"):
+        super().__init__()
+        self.cog = cog
+
+    async def on_submit(self, i: discord.Interaction):
+        try:
+            page = int(str(self.page.value).strip())
+        except ValueError:
+            await i.response.send_message(f"{i.client.brand_prefix} Enter a page number.", ephemeral=True)
+            return
+        await self.cog.show_page(i, page, wrap=False)
+
+
 class LeaderboardRefresh(discord.ui.View):
     def __init__(self, cog: "LeaderboardCog"):
         super().__init__(timeout=None)
         self.cog = cog
 
     @discord.ui.button(label="Refresh Leaderboard", style=discord.ButtonStyle.primary, custom_id="wr_lb_refresh")
+    @timed("wr_lb_refresh")
     async def refresh(self, i: discord.Interaction, b: discord.ui.Button):
         await i.response.defer(ephemeral=True, thinking=True)
-        await self.cog.post_or_update_leaderboard_box(i.guild)
+        await self.cog.schedule_refresh(i.guild)
         await i.followup.send(f"{i.client.brand_prefix} 🔄 Leaderboard refreshed.", ephemeral=True)
 
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary, custom_id="wr_lb_prev")
+    @timed("wr_lb_prev")
+    async def prev(self, i: discord.Interaction, b: discord.ui.Button):
+        await self.cog.show_page(i, _page_of(i.message) - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary, custom_id="wr_lb_next")
+    @timed("wr_lb_next")
+    async def next(self, i: discord.Interaction, b: discord.ui.Button):
+        await self.cog.show_page(i, _page_of(i.message) + 1)
+
+    @discord.ui.button(label="Jump to page", style=discord.ButtonStyle.secondary, custom_id="wr_lb_jump")
+    @timed("wr_lb_jump")
+    async def jump(self, i: discord.Interaction, b: discord.ui.Button):
+        await i.response.send_modal(LeaderboardJump(self.cog))
+
 
 class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.refresher = RefreshScheduler(self.post_or_update_leaderboard_box, REFRESH_DELAY)
+        # guild id -> (data version it was rendered from, pages)
+        self._rendered: Dict[int, Tuple[tuple, List[discord.Embed]]] = {}
+
+    async def cog_load(self):
+        wr_counts.rebuild(subs().get("approved", []))
+        category_index.rebuild(subs())
 
     # -------------------------- Setup --------------------------
     async def ensure_wr_roles(self, guild: discord.Guild) -> Dict[str, discord.Role]:
         """Ensure all WR roles exist. Returns mapping of role name -> role object."""
-        existing = {r.name: r for r in guild.roles}
+        if role_cache.is_ensured(guild.id, "wr_tiers"):
+            result = {name: role_cache.get(guild, name) for (name, _m, _c, _i) in WR_ROLE_THEME["tiers"]}
+            if all(result.values()):
+                return result
+
         result: Dict[str, discord.Role] = {}
         me: discord.Member = guild.me
 
@@ -66,8 +125,9 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
         base_pos = max(base_pos, 1)
 
         for idx, (role_name, _min, color_int, _ic) in enumerate(WR_ROLE_THEME["tiers"]):
-            if role_name in existing:
-                result[role_name] = existing[role_name]
+            existing = role_cache.get(guild, role_name)
+            if existing:
+                result[role_name] = existing
                 continue
             try:
                 r = await guild.create_role(
@@ -76,6 +136,7 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
                     reason="Auto-create WR role",
                     mentionable=False,
                 )
+                role_cache.remember(r)
                 try:
                     await r.edit(position=base_pos - (len(WR_ROLE_THEME["tiers"]) - idx), reason="Position WR roles")
                 except Exception:
@@ -84,23 +145,17 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
             except Exception as e:
                 if hasattr(self.bot, "logger"):
                     self.bot.logger.warning(f"[{guild.name}] Failed creating role {role_name}: {e}")
+        if len(result) == len(WR_ROLE_THEME["tiers"]):
+            role_cache.mark_ensured(guild.id, "wr_tiers")
         return result
 
     # ----------------- WR Counting & Display -------------------
     def _guild_wr_counts(self, guild: discord.Guild) -> Dict[int, int]:
-        """Build a counter of total approved WRs per player (id) for this guild."""
-        data = subs()
-        counts: Dict[int, int] = {}
-        for rec in data.get("approved", []):
-            if rec.get("guild_id") != guild.id:
-                continue
-            for pid in rec.get("players", []):
-                counts[pid] = counts.get(pid, 0) + 1
-        return counts
+        """Total approved WRs per player (id) for this guild, from the maintained index."""
+        return wr_counts.totals(guild.id)
 
-    def _format_line(self, guild: discord.Guild, user_id: int, wrs: int, rank: int) -> str:
-        m = guild.get_member(user_id)
-        display = m.display_name if m else f"<@{user_id}>"
+    def _format_line(self, guild: discord.Guild, user_id: int, wrs: int, rank: int, name: Optional[str] = None) -> str:
+        display = name or f"<@{user_id}>"
         tier = tier_for_count(wrs)
 
         # Rank icons for top 3
@@ -118,25 +173,66 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
             return f"{rank_icon} **{display}** — {wrs} WRs · {icon} *{role_name}*"
         return f"{rank_icon} **{display}** — {wrs} WRs"
 
-    def leaderboard_embed(self, guild: discord.Guild) -> discord.Embed:
+    def leaderboard_pages(self, guild: discord.Guild) -> List[discord.Embed]:
+        """All leaderboard pages for this guild, cached until submissions or names change."""
+        version = (store.versions["subs"], name_cache.version)
+        hit = self._rendered.get(guild.id)
+        if hit and hit[0] == version:
+            return hit[1]
+
         counts = self._guild_wr_counts(guild)
+        # One name lookup per player; user id breaks ties so the order is stable
+        names = {uid: name_cache.name(guild, uid) for uid in counts}
         rows: List[Tuple[int, int]] = sorted(
             counts.items(),
-            key=lambda kv: (-kv[1], guild.get_member(kv[0]).display_name.lower() if guild.get_member(kv[0]) else str(kv[0]))
-        )
-        description_lines: List[str] = []
-        for idx, (uid, wrs) in enumerate(rows[:MAX_ROWS], start=1):
-            description_lines.append(self._format_line(guild, uid, wrs, idx))
-
-        e = discord.Embed(
-            title=LEADERBOARD_TITLE,
-            description="\n".join(description_lines) if description_lines else "_No world records yet._",
-            color=0x0A0A23  # Abyssus dark theme
+            key=lambda kv: (-kv[1], (names[kv[0]] or str(kv[0])).lower(), kv[0])
         )
-        e.set_footer(text="Abyssus · World Records")
-        return e
+
+        chunks: List[List[str]] = []
+        used = 0
+        for idx, (uid, wrs) in enumerate(rows, start=1):
+            line = self._format_line(guild, uid, wrs, idx, names[uid])
+            if not chunks or len(chunks[-1]) >= PAGE_SIZE or used + len(line) + 1 > PAGE_CHARS:
+                chunks.append([])
+                used = 0
+            chunks[-1].append(line)
+            used += len(line) + 1
+
+        pages: List[discord.Embed] = []
+        for n, chunk in enumerate(chunks or [[]], start=1):
+            e = discord.Embed(
+                title=LEADERBOARD_TITLE,
+                description="\n".join(chunk) if chunk else "_No world records yet._",
+                color=0x0A0A23  # Abyssus dark theme
+            )
+            e.set_footer(text=f"Abyssus · World Records · Page {n}/{max(len(chunks), 1)}")
+            pages.append(e)
+        self._rendered[guild.id] = (version, pages)
+        return pages
+
+    def leaderboard_embed(self, guild: discord.Guild) -> discord.Embed:
+        return self.leaderboard_pages(guild)[0]
+
+    async def show_page(self, i: discord.Interaction, page: int, wrap: bool = True):
+        """Answer a paging interaction with `page` from the cache.
+
+        Clicks on the public panel get a new ephemeral page; clicks on an
+        ephemeral page edit it in place.
+        """
+        pages = self.leaderboard_pages(i.guild)
+        page = (page - 1) % len(pages) + 1 if wrap else max(1, min(page, len(pages)))
+        embed, view = pages[page - 1], LeaderboardRefresh(self)
+        if i.message is not None and i.message.flags.ephemeral:
+            await i.response.edit_message(embed=embed, view=view)
+        else:
+            await i.response.send_message(embed=embed, view=view, ephemeral=True)
 
     # ----------------- Role Assignment Logic -------------------
+    def _tier_roles(self, wr_count: int, role_map: Dict[str, discord.Role]) -> List[Optional[discord.Role]]:
+        """The WR tier role a member with `wr_count` approved WRs should wear (empty for none)."""
+        target = tier_for_count(wr_count)
+        return [role_map.get(target[0])] if target else []
+
     async def assign_roles_for_member(self, guild: discord.Guild, member_id: int, wr_count: Optional[int] = None):
         """Ensure the member has exactly their highest WR role (and none of the lower tiers)."""
         member = guild.get_member(member_id)
@@ -147,23 +243,11 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
             wr_count = self._guild_wr_counts(guild).get(member_id, 0)
 
         role_map = await self.ensure_wr_roles(guild)
-
-        target = tier_for_count(wr_count)
-        target_role: Optional[discord.Role] = role_map.get(target[0]) if target else None
-
-        wr_role_names = {name for (name, _m, _c, _i) in WR_ROLE_THEME["tiers"]}
-        member_wr_roles = [r for r in member.roles if r.name in wr_role_names]
-
-        if target_role and len(member_wr_roles) == 1 and member_wr_roles[0].id == target_role.id:
-            return
-        if not target_role and not member_wr_roles:
+        roles = desired_roles(member, role_map.values(), self._tier_roles(wr_count, role_map))
+        if roles is None:
             return
-
         try:
-            if member_wr_roles:
-                await member.remove_roles(*member_wr_roles, reason="WR role update")
-            if target_role:
-                await member.add_roles(target_role, reason="WR role update")
+            await member.edit(roles=roles, reason="WR role update")
         except Exception:
             pass
 
@@ -171,18 +255,21 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
         count = self._guild_wr_counts(guild).get(member_id, 0)
         await self.assign_roles_for_member(guild, member_id, count)
 
-    async def recompute_all_for_guild(self, guild: discord.Guild):
+    async def recompute_all_for_guild(self, guild: discord.Guild, progress=None) -> Tuple[int, int]:
+        """Bring every member's WR tier role in line with their count. Returns (members changed, members checked)."""
         counts = self._guild_wr_counts(guild)
-        await self.ensure_wr_roles(guild)
-        for uid, c in counts.items():
-            await self.assign_roles_for_member(guild, uid, c)
+        role_map = await self.ensure_wr_roles(guild)
+        return await reconcile_roles(
+            guild, list(role_map.values()), counts, lambda m: self._tier_roles(counts.get(m.id, 0), role_map),
+            "WR role update", ROLE_SYNC_CONCURRENCY, progress,
+        )
 
     # ---------------- Leaderboard Posting/Updating --------------
     async def _get_leaderboard_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
         name = getattr(self.bot, "canonical_channels", {}).get("leaderboard", LEADERBOARD_CHANNEL_NAME)
-        return discord.utils.get(guild.text_channels, name=name)
+        return channel_map.resolve(guild, "leaderboard", name)
 
-    async def post_or_update_leaderboard_box(self, guild: discord.Guild):
+    async def post_or_update_leaderboard_box(self, guild: discord.Guild, force: bool = False):
         await self.ensure_wr_roles(guild)
 
         ch = await self._get_leaderboard_channel(guild)
@@ -193,26 +280,46 @@ class LeaderboardCog(commands.Cog, name="LeaderboardCog"):
         embed = self.leaderboard_embed(guild)
         view = LeaderboardRefresh(self)
 
-        async for m in ch.history(limit=50):
-            if m.author == guild.me and m.embeds and m.embeds[0].title == marker:
-                await m.edit(embed=embed, view=view)
-                return
-        await ch.send(embed=embed, view=view)
+        await upsert_panel(guild, ch, "leaderboard", marker, force=force, embed=embed, view=view)
+
+    def schedule_refresh(self, guild: discord.Guild):
+        """Queue a debounced leaderboard refresh; await the result to wait for it."""
+        return self.refresher.request(guild.id, guild)
 
     # -------------------- Slash Commands -----------------------
     @app_commands.command(name="setup-leaderboard-box", description="Post or refresh the WR leaderboard panel in this server")
     @app_commands.checks.has_permissions(administrator=True)
     async def setup_leaderboard_box(self, interaction: discord.Interaction):
-        await self.post_or_update_leaderboard_box(interaction.guild)
+        await self.post_or_update_leaderboard_box(interaction.guild, force=True)
         await interaction.response.send_message(f"{self.bot.brand_prefix} Leaderboard panel posted/updated.", ephemeral=True)
 
     @app_commands.command(name="refresh-leaderboard", description="Recompute WRs, update roles, and refresh the leaderboard")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def refresh_leaderboard(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        await self.recompute_all_for_guild(interaction.guild)
+        started = last = time.monotonic()
+
+        async def progress(done: int, total: int):
+            nonlocal last
+            now = time.monotonic()
+            if done < total and now - last < PROGRESS_EVERY:
+                return
+            last = now
+            eta = (now - started) / done * (total - done)
+            try:
+                await interaction.edit_original_response(
+                    content=f"{self.bot.brand_prefix} 🔄 Updating roles: {done}/{total} · ETA {eta:.0f}s"
+                )
+            except Exception:
+                pass
+
+        changed, checked = await self.recompute_all_for_guild(interaction.guild, progress)
         await self.post_or_update_leaderboard_box(interaction.guild)
-        await interaction.followup.send(f"{self.bot.brand_prefix} ✅ Leaderboard refreshed and roles updated.", ephemeral=True)
+        await interaction.followup.send(
+            f"{self.bot.brand_prefix} ✅ Leaderboard refreshed and roles updated "
+            f"({changed} of {checked} members changed in {time.monotonic() - started:.0f}s).",
+            ephemeral=True
+        )
 
 
 async def setup(bot: commands.Bot):
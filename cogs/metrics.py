@@ -0,0 +1,115 @@
+# cogs/metrics.py
+# Latency histograms and Discord REST counters behind /wr-perf and /metrics.
+import re, time, bisect, functools, threading
+from typing import Dict, List, Tuple
+
+# Latency histogram bucket bounds, in seconds
+PERF_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus-style cumulative on export)."""
+
+    def __init__(self, bounds: Tuple[float, ...] = PERF_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (max for the +Inf bucket)."""
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return 0.0
+
+class PerfStats:
+    """Latency histograms keyed (kind, name) and REST call counters keyed (method, route)."""
+
+    def __init__(self):
+        self.started = time.time()
+        # Writer threads record storage timings too
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.http: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def observe(self, kind: str, name: str, seconds: float):
+        with self._lock:
+            hist = self.latency.get((kind, name))
+            if hist is None:
+                hist = self.latency[(kind, name)] = Histogram()
+            hist.observe(seconds)
+
+    def timer(self, kind: str, name: str) -> "_Timer":
+        """`with perf.timer("storage", "save:subs"): ...` records how long the block took."""
+        return _Timer(self, kind, name)
+
+    def count_http(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            c = self.http.setdefault((method, route), {"calls": 0, "429": 0, "errors": 0, "seconds": 0.0})
+            c["calls"] += 1
+            c["seconds"] += seconds
+            if status == 429:
+                c["429"] += 1
+            elif status >= 400:
+                c["errors"] += 1
+
+    def snapshot(self) -> Tuple[List[Tuple[Tuple[str, str], Histogram]], List[Tuple[Tuple[str, str], Dict[str, float]]]]:
+        """Copies of the latency and HTTP tables, safe to iterate while writers keep recording."""
+        with self._lock:
+            return list(self.latency.items()), [(k, dict(v)) for k, v in self.http.items()]
+
+    def trace_config(self):
+        """aiohttp TraceConfig that feeds count_http(); pass it to the Bot as http_trace."""
+        import aiohttp
+        trace = aiohttp.TraceConfig()
+
+        async def on_start(session, ctx, params):
+            ctx.started = time.perf_counter()
+
+        async def on_end(session, ctx, params):
+            self.count_http(params.method, api_route(params.url.path), params.response.status,
+                            time.perf_counter() - ctx.started)
+
+        trace.on_request_start.append(on_start)
+        trace.on_request_end.append(on_end)
+        return trace
+
+class _Timer:
+    def __init__(self, stats: PerfStats, kind: str, name: str):
+        self.stats, self.kind, self.name = stats, kind, name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.observe(self.kind, self.name, time.perf_counter() - self.started)
+
+perf = PerfStats()
+
+_ROUTE_TOKEN = re.compile(r"/(webhooks|interactions)/(\{id\})/[^/]+")
+
+def api_route(path: str) -> str:
+    """URL path with the API prefix, ids and interaction tokens replaced, e.g. /channels/{id}/messages."""
+    path = re.sub(r"^/api/v\d+", "", path)
+    path = re.sub(r"/\d{5,}", "/{id}", path)
+    return _ROUTE_TOKEN.sub(r"/\1/\2/{token}", path)
+
+def timed(name: str, kind: str = "button"):
+    """Decorator recording an async callback's latency in perf under (kind, name)."""
+    def wrap(func):
+        @functools.wraps(func)
+        async def run(*args, **kwargs):
+            with perf.timer(kind, name):
+                return await func(*args, **kwargs)
+        return run
+    return wrap
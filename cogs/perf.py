@@ -0,0 +1,246 @@
+# cogs/perf.py
+import os, io, sys, math, time, pstats, marshal, asyncio, logging, cProfile, threading, traceback
+import discord
+from discord.ext import commands
+from discord import app_commands
+from typing import List
+from .metrics import perf
+
+# Serve Prometheus metrics on this port (unset/0 = off); bind address defaults to localhost
+METRICS_PORT = int(os.getenv("WR_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("WR_METRICS_HOST", "127.0.0.1")
+
+# Log the event loop's stack when a ping takes longer than this (0 = no watchdog)
+LOOP_LAG_MS = int(os.getenv("WR_LOOP_LAG_MS", "250"))
+LOOP_PING_EVERY = 0.1  # a block is caught once it runs past this + the threshold
+
+# /wr-profile limits and how many functions go in the text report
+PROFILE_MAX_SECONDS = 120
+PROFILE_TOP = 60
+
+# Rows shown per embed section
+TOP_ROUTES = 10
+FIELD_LIMIT = 1024
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms" if seconds < 10 else f"{seconds:.1f}s"
+
+def _uptime(seconds: float) -> str:
+    h, rest = divmod(int(seconds), 3600)
+    return f"{h}h {rest // 60:02d}m"
+
+def _field(lines: List[str]) -> str:
+    out, size = [], 0
+    for line in lines:
+        if size + len(line) + 1 > FIELD_LIMIT - 2:
+            out.append("…")
+            break
+        out.append(line)
+        size += len(line) + 1
+    return "\n".join(out) or "—"
+
+def prometheus_text() -> str:
+    """Everything in `perf` in the Prometheus text exposition format."""
+    latency, http = perf.snapshot()
+    lines = [
+        "# HELP wr_latency_seconds Latency of commands, buttons, modals, storage and startup steps.",
+        "# TYPE wr_latency_seconds histogram",
+    ]
+    for (kind, name), h in sorted(latency):
+        labels = f'kind="{kind}",name="{name}"'
+        total = 0
+        for i, n in enumerate(h.counts):
+            total += n
+            le = repr(h.bounds[i]) if i < len(h.bounds) else "+Inf"
+            lines.append(f'wr_latency_seconds_bucket{{{labels},le="{le}"}} {total}')
+        lines.append(f"wr_latency_seconds_sum{{{labels}}} {h.sum}")
+        lines.append(f"wr_latency_seconds_count{{{labels}}} {h.count}")
+    for metric, key, help_text in (
+        ("wr_http_requests_total", "calls", "Discord REST requests sent."),
+        ("wr_http_ratelimited_total", "429", "Discord REST requests answered with 429."),
+        ("wr_http_errors_total", "errors", "Discord REST requests answered with another 4xx/5xx."),
+        ("wr_http_seconds_total", "seconds", "Time spent waiting on Discord REST requests."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for (method, route), c in sorted(http):
+            lines.append(f'{metric}{{method="{method}",route="{route}"}} {c[key]}')
+    lines.append("# HELP wr_uptime_seconds Seconds since the bot process started.")
+    lines.append("# TYPE wr_uptime_seconds gauge")
+    lines.append(f"wr_uptime_seconds {time.time() - perf.started:.0f}")
+    return "\n".join(lines) + "\n"
+
+class LoopWatchdog:
+    """Pings the event loop from a side thread and records how late each ping runs.
+
+    Lag goes into perf as ("loop", "lag"). When a ping is still waiting after
+    `threshold` seconds, the loop thread's current stack is logged, which
+    names the synchronous call that is blocking it. Create it on the loop thread.
+    """
+
+    def __init__(self, threshold: float, interval: float = LOOP_PING_EVERY):
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wr-loop-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            ran = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(ran.set)
+            except RuntimeError:
+                return  # loop closed
+            if not ran.wait(self.threshold):
+                self.stalls += 1
+                self._report()
+                while not ran.wait(1.0):
+                    if self._stop.is_set() or self.loop.is_closed():
+                        return
+            perf.observe("loop", "lag", time.perf_counter() - sent)
+
+    def _report(self):
+        frame = sys._current_frames().get(self.loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame else "  (loop thread not found)\n"
+        task = asyncio.current_task(self.loop)
+        where = f"task {task.get_name()} ({task.get_coro().__qualname__})" if task else "a loop callback"
+        logging.warning(f"Event loop blocked for over {self.threshold * 1000:.0f}ms in {where}; stack:\n{stack}")
+
+class PerfCog(commands.Cog, name="PerfCog"):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._runner = None
+        self.watchdog = None
+        self._profiling = False
+
+    async def cog_load(self):
+        if LOOP_LAG_MS > 0:
+            self.watchdog = LoopWatchdog(LOOP_LAG_MS / 1000)
+            self.watchdog.start()
+        if METRICS_PORT:
+            await self.start_metrics_server()
+
+    async def cog_unload(self):
+        if self.watchdog:
+            self.watchdog.stop()
+            self.watchdog = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def start_metrics_server(self):
+        from aiohttp import web
+
+        async def metrics(request: web.Request) -> web.Response:
+            return web.Response(body=prometheus_text().encode(),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, METRICS_HOST, METRICS_PORT).start()
+        except OSError as e:
+            logging.error(f"Metrics endpoint on {METRICS_HOST}:{METRICS_PORT} failed to start: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        logging.info(f"Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    # Measured from the interaction's snowflake timestamp, so this includes
+    # gateway delivery as well as the handler itself
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        perf.observe("command", command.qualified_name, max(elapsed, 0.0))
+
+    def perf_embed(self) -> discord.Embed:
+        latency, http = perf.snapshot()
+        embed = discord.Embed(title=f"{self.bot.brand_prefix} Performance", color=self.bot.theme_color)
+
+        for kind, title in (("command", "Commands"), ("button", "Buttons"), ("modal", "Modals"),
+                            ("storage", "Storage"), ("startup", "Startup"), ("loop", "Event loop")):
+            rows = sorted(((name, h) for (k, name), h in latency if k == kind), key=lambda r: -r[1].count)
+            if not rows:
+                continue
+            lines = [
+                f"`{name}` n={h.count} · p50 {_ms(h.quantile(0.5))} · p95 {_ms(h.quantile(0.95))} "
+                f"· p99 {_ms(h.quantile(0.99))} · max {_ms(h.max)}"
+                for name, h in rows
+            ]
+            embed.add_field(name=title, value=_field(lines), inline=False)
+
+        routes = sorted(http, key=lambda r: -r[1]["calls"])
+        calls = sum(c["calls"] for _, c in routes)
+        limited = sum(c["429"] for _, c in routes)
+        lines = [
+            f"`{method} {route}` {c['calls']:.0f} · avg {_ms(c['seconds'] / c['calls'])}"
+            + (f" · {c['429']:.0f}×429" if c["429"] else "")
+            + (f" · {c['errors']:.0f} err" if c["errors"] else "")
+            for (method, route), c in routes[:TOP_ROUTES]
+        ]
+        embed.add_field(name=f"Discord API — {calls:.0f} calls, {limited:.0f} rate-limited",
+                        value=_field(lines), inline=False)
+
+        footer = f"Uptime {_uptime(time.time() - perf.started)}"
+        if math.isfinite(self.bot.latency):
+            footer += f" · gateway {_ms(self.bot.latency)}"
+        if self.watchdog:
+            footer += f" · {self.watchdog.stalls} loop stall(s) over {LOOP_LAG_MS}ms"
+        if self._runner:
+            footer += f" · metrics on :{METRICS_PORT}"
+        embed.set_footer(text=footer)
+        return embed
+
+    @app_commands.command(name="wr-perf", description="Show bot latency, storage and Discord API stats")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def wr_perf(self, interaction: discord.Interaction):
+        await interaction.response.send_message(embed=self.perf_embed(), ephemeral=True)
+
+    @app_commands.command(name="wr-profile", description="Profile the bot for a few seconds and attach the report")
+    @app_commands.describe(seconds=f"How long to profile (1-{PROFILE_MAX_SECONDS}, default 10)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def wr_profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = 10):
+        if self._profiling:
+            await interaction.response.send_message(f"{self.bot.brand_prefix} A profile is already running.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # cProfile hooks the thread that enables it, which is the event loop
+        # thread: everything the bot runs in the meantime ends up in the profile
+        self._profiling = True
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            prof.disable()
+            self._profiling = False
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        text = io.StringIO()
+        stats = pstats.Stats(prof, stream=text)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        stats.sort_stats("tottime").print_stats(PROFILE_TOP)
+        raw = marshal.dumps(stats.stats)  # what Stats.dump_stats() writes
+        await interaction.followup.send(
+            f"{self.bot.brand_prefix} Profiled {seconds}s. The `.prof` file opens with `python -m pstats` or snakeviz.",
+            files=[
+                discord.File(io.BytesIO(text.getvalue().encode()), filename=f"wr-profile-{stamp}.txt"),
+                discord.File(io.BytesIO(raw), filename=f"wr-profile-{stamp}.prof"),
+            ],
+            ephemeral=True,
+        )
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PerfCog(bot))
@@ -1,6 +1,7 @@
 # cogs/roles.py
 import discord
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .util import role_cache, wr_counts, desired_roles, reconcile_roles
 
 # ---------- Theme & Tiers ----------
 THEME_PREFIX = "Abyssal "  # visible brand
@@ -22,10 +23,19 @@ BADGE_DEFS = {
 }
 
 def _find_role(guild: discord.Guild, name: str) -> Optional[discord.Role]:
-    return discord.utils.get(guild.roles, name=name)
+    return role_cache.get(guild, name)
+
+def _has(member: discord.Member, role: discord.Role) -> bool:
+    return member.get_role(role.id) is not None
 
 async def ensure_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
     """Create prestige tiers + badge roles if missing. Return dict of all roles."""
+    if role_cache.is_ensured(guild.id, "prestige"):
+        names = [meta["name"] for meta in TIER_THRESHOLDS.values()] + [meta["name"] for meta in BADGE_DEFS.values()]
+        cached = {name: _find_role(guild, name) for name in names}
+        if all(cached.values()):
+            return cached
+
     created: Dict[str, discord.Role] = {}
 
     # Create tiers
@@ -37,6 +47,7 @@ async def ensure_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
             except Exception:
                 # fallback without color if lacking perms
                 r = _find_role(guild, meta["name"]) or await guild.create_role(name=meta["name"], reason="WR prestige auto-setup (no color)")
+            role_cache.remember(r)
         created[meta["name"]] = r
 
     # Create badges
@@ -44,6 +55,7 @@ async def ensure_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
         r = _find_role(guild, meta["name"])
         if not r:
             r = await guild.create_role(name=meta["name"], mentionable=False, reason="WR badge auto-setup")
+            role_cache.remember(r)
         created[meta["name"]] = r
 
     # Try to place prestige roles near the top (best-effort).
@@ -58,15 +70,48 @@ async def ensure_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
     except Exception:
         pass
 
+    role_cache.mark_ensured(guild.id, "prestige")
     return created
 
+def prestige_level(wr_count: int) -> int:
+    """Prestige level (0 = none) for an approved WR count."""
+    return max((lvl for lvl in TIER_THRESHOLDS if wr_count >= lvl), default=0)
+
+def badges_for(breakdown: Dict[Tuple[str, str], int]) -> List[str]:
+    """Badge keys earned, from a wr_counts.breakdown() entry."""
+    earned = {
+        "solo": ("mode", "Solo"),
+        "team": ("mode", "Team"),
+        "time": ("metric", "time"),
+        "damage": ("metric", "damage"),
+    }
+    return [key for key, cat in earned.items() if breakdown.get(cat)]
+
+def _wanted_roles(level: int, badges: List[str], roles: Dict[str, discord.Role]) -> List[Optional[discord.Role]]:
+    """Prestige role for `level` plus the earned badge roles."""
+    want = [roles.get(BADGE_DEFS[key]["name"]) for key in badges]
+    if level:
+        want.append(roles.get(TIER_THRESHOLDS[level]["name"]))
+    return want
+
+async def sync_guild_roles(guild: discord.Guild, concurrency: int = 4,
+                           progress: Optional[Callable[[int, int], Any]] = None) -> Tuple[int, int]:
+    """Bring every member's prestige and badge roles in line with their approved WRs (see reconcile_roles)."""
+    roles = await ensure_roles(guild)
+    totals = wr_counts.totals(guild.id)
+    return await reconcile_roles(
+        guild, list(roles.values()), totals,
+        lambda m: _wanted_roles(prestige_level(totals.get(m.id, 0)), badges_for(wr_counts.breakdown(guild.id, m.id)), roles),
+        "WR prestige/badges update", concurrency, progress,
+    )
+
 def highest_prestige_for(member: discord.Member) -> Optional[discord.Role]:
     """Return the highest prestige role the member currently has (if any)."""
     got = []
     for lvl in sorted(TIER_THRESHOLDS.keys(), reverse=True):
         name = TIER_THRESHOLDS[lvl]["name"]
         r = _find_role(member.guild, name)
-        if r and r in member.roles:
+        if r and _has(member, r):
             got.append((lvl, r))
     return got[0][1] if got else None
 
@@ -75,49 +120,11 @@ async def sync_member_roles(member: discord.Member, wr_count: int, badges: List[
     Assign exactly one prestige role based on wr_count (thresholds 1/2/3/4),
     and add/remove badge roles in `badges` (keys from BADGE_DEFS).
     """
-    await ensure_roles(member.guild)
-
-    # Determine target prestige level
-    target_lvl = 0
-    for lvl in sorted(TIER_THRESHOLDS.keys()):
-        if wr_count >= lvl:
-            target_lvl = lvl
-
-    # Gather roles
-    prestige_roles = { TIER_THRESHOLDS[l]["name"]: _find_role(member.guild, TIER_THRESHOLDS[l]["name"]) for l in TIER_THRESHOLDS }
-    target_role = prestige_roles[TIER_THRESHOLDS[target_lvl]["name"]] if target_lvl else None
-
-    to_add = []
-    to_remove = []
-
-    # Ensure only the target prestige is present
-    for name, role in prestige_roles.items():
-        if not role: 
-            continue
-        if role in member.roles and role != target_role:
-            to_remove.append(role)
-    if target_role and target_role not in member.roles:
-        to_add.append(target_role)
-
-    # Badge roles
-    for key, meta in BADGE_DEFS.items():
-        r = _find_role(member.guild, meta["name"])
-        if not r: 
-            continue
-        should_have = key in badges
-        if should_have and r not in member.roles:
-            to_add.append(r)
-        if (not should_have) and r in member.roles:
-            to_remove.append(r)
-
-    # Apply
-    if to_remove:
-        try: 
-            await member.remove_roles(*to_remove, reason="WR prestige/badges update")
-        except Exception:
-            pass
-    if to_add:
-        try: 
-            await member.add_roles(*to_add, reason="WR prestige/badges update")
-        except Exception:
-            pass
+    roles = await ensure_roles(member.guild)
+    new = desired_roles(member, roles.values(), _wanted_roles(prestige_level(wr_count), badges, roles))
+    if new is None:
+        return
+    try:
+        await member.edit(roles=new, reason="WR prestige/badges update")
+    except Exception:
+        pass
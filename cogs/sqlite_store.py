@@ -0,0 +1,218 @@
+# cogs/sqlite_store.py
+# Optional SQLite backend for submissions (WR_STORAGE=sqlite). Stdlib sqlite3 only.
+import os, sys, json, sqlite3, argparse, threading
+from typing import Dict, Any, List, Optional, Callable
+
+TABLES = ("pending", "approved", "records")
+
+# Row columns besides `pos` (the rowid, which keeps arrival order)
+COLUMNS = "guild_id, metric, mode, size, season, sort_key, pending_message_id, body, submission_id"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+""" + "".join(f"""
+CREATE TABLE IF NOT EXISTS {t} (
+    pos                INTEGER PRIMARY KEY,
+    guild_id           INTEGER,
+    metric             TEXT,
+    mode               TEXT,
+    size               INTEGER,
+    season             INTEGER,
+    sort_key           REAL,
+    pending_message_id INTEGER,
+    body               TEXT NOT NULL,
+    submission_id      TEXT
+);
+""" for t in TABLES)
+
+# Created after _upgrade() so databases from before submission_id existed get the column first
+INDEXES = "".join(f"""
+CREATE INDEX IF NOT EXISTS ix_{t}_board ON {t}(guild_id, metric, mode, size, season, sort_key);
+CREATE INDEX IF NOT EXISTS ix_{t}_season ON {t}(guild_id, season);
+CREATE INDEX IF NOT EXISTS ix_{t}_msg ON {t}(pending_message_id);
+""" for t in TABLES) + """
+CREATE INDEX IF NOT EXISTS ix_pending_sid ON pending(submission_id);
+"""
+
+BOARD = "guild_id = ? AND metric = ? AND mode = ? AND size = ? AND season = ?"
+
+
+class SqliteBackend:
+    """Stores the submissions dict as three indexed tables.
+
+    Exposes the same load()/save() pair as util.JsonFile so util.Store can
+    keep serving the dict from memory, plus append(ops): each group commit's
+    mutations (see util.apply_op) become row-level INSERT/UPDATE/DELETEs
+    found through the message-id and submission-id indexes, so an approval
+    costs the same at any history size. save() replaces everything and is
+    only used for migration and explicit full saves. leaderboard() and
+    current_season() are index range scans, served by util.leaderboard_slice
+    when this backend is active. Writes share one connection under a lock;
+    queries from the event loop use a second connection (WAL lets them read
+    while a write is in progress).
+    """
+
+    def __init__(self, path: str, json_path: Optional[str] = None, sort_key: Callable[[Dict[str, Any]], float] = None):
+        self.path = path
+        self.json_path = json_path
+        self.sort_key = sort_key or (lambda rec: 0.0)
+        self._lock = threading.Lock()
+        self._wr = self._connect()
+        self._wr.executescript(SCHEMA)
+        self._upgrade()
+        self._wr.executescript(INDEXES)
+        self._rlock = threading.Lock()
+        self._rd = self._connect()
+        # Records copied by the automatic first-use migration (None if the DB was already set up)
+        self.migrated: Optional[int] = None
+        if self._meta("migrated") is None:
+            self.migrated = self.migrate_from_json()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _upgrade(self):
+        """Add and fill submission_id in databases created before per-op writes."""
+        with self._wr:
+            for t in TABLES:
+                cols = {row[1] for row in self._wr.execute(f"PRAGMA table_info({t})")}
+                if "submission_id" in cols:
+                    continue
+                self._wr.execute(f"ALTER TABLE {t} ADD COLUMN submission_id TEXT")
+                rows = self._wr.execute(f"SELECT pos, body FROM {t}").fetchall()
+                self._wr.executemany(f"UPDATE {t} SET submission_id = ? WHERE pos = ?",
+                                     [(json.loads(body).get("submission_id"), pos) for pos, body in rows])
+
+    # ----------------------- load / save -----------------------
+    def load(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = json.loads(self._meta("extra") or "{}")
+            for t in TABLES:
+                rows = self._wr.execute(f"SELECT body FROM {t} ORDER BY pos")
+                data[t] = [json.loads(body) for (body,) in rows]
+        return data
+
+    def save(self, data: Dict[str, Any]):
+        """Replace the stored submissions with `data` in one transaction."""
+        rows = {t: [(pos,) + self._row(r) for pos, r in enumerate(list(data.get(t, [])))] for t in TABLES}
+        extra = {k: v for k, v in data.items() if k not in TABLES}
+        with self._lock, self._wr:
+            for t in TABLES:
+                self._wr.execute(f"DELETE FROM {t}")
+                self._wr.executemany(f"INSERT INTO {t} (pos, {COLUMNS}) VALUES (?,?,?,?,?,?,?,?,?,?)", rows[t])
+            self._wr.execute("INSERT OR REPLACE INTO meta VALUES ('extra', ?)", (json.dumps(extra),))
+
+    def append(self, ops: List[Dict[str, Any]]):
+        """Write one group commit's ops as row changes, in one transaction."""
+        with self._lock, self._wr:
+            for op in ops:
+                kind = op["op"]
+                if kind == "enqueue":
+                    self._wr.execute(f"INSERT INTO pending ({COLUMNS}) VALUES (?,?,?,?,?,?,?,?,?)", self._row(op["rec"]))
+                elif kind == "attach":
+                    row = self._wr.execute("SELECT pos, body FROM pending WHERE submission_id = ?",
+                                           (op["submission_id"],)).fetchone()
+                    if row:
+                        rec = json.loads(row[1])
+                        rec["pending_message_id"] = op["message_id"]
+                        self._wr.execute("UPDATE pending SET pending_message_id = ?, body = ? WHERE pos = ?",
+                                         (op["message_id"], json.dumps(rec), row[0]))
+                elif kind in ("approve", "reject"):
+                    row = self._wr.execute("SELECT pos FROM pending WHERE pending_message_id = ? LIMIT 1",
+                                           (op["message_id"],)).fetchone()
+                    if row:
+                        if kind == "approve":
+                            self._wr.execute(f"INSERT INTO approved ({COLUMNS}) SELECT {COLUMNS} FROM pending WHERE pos = ?", row)
+                        self._wr.execute("DELETE FROM pending WHERE pos = ?", row)
+                else:
+                    raise ValueError(f"Unknown submission op: {kind}")
+
+    def _row(self, rec: Dict[str, Any]) -> tuple:
+        try:
+            size = int(rec.get("size", 1))
+        except (TypeError, ValueError):
+            size = 1
+        return (
+            rec.get("guild_id"), rec.get("metric"), rec.get("mode"), size,
+            rec.get("season", 1), self.sort_key(rec), rec.get("pending_message_id"),
+            json.dumps(rec), rec.get("submission_id"),
+        )
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._wr.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ------------------------- queries -------------------------
+    def _query(self, sql: str, args: tuple) -> List[tuple]:
+        with self._rlock:
+            return self._rd.execute(sql, args).fetchall()
+
+    def current_season(self, guild_id: int) -> int:
+        """Latest season with a run in this guild (1 if none)."""
+        rows = self._query(
+            "SELECT MAX(s) FROM (SELECT MAX(season) AS s FROM approved WHERE guild_id = ?"
+            " UNION ALL SELECT MAX(season) FROM records WHERE guild_id = ?)",
+            (guild_id, guild_id),
+        )
+        return rows[0][0] or 1
+
+    def leaderboard(self, guild_id: int, metric: str, mode: str, size: int, season: str = "current",
+                    k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ranked runs for one category, best first; ties keep arrival order, legacy records first."""
+        sel = self.current_season(guild_id) if season == "current" else int(season)
+        args = (guild_id, metric, mode, size, sel)
+        # Each arm walks ix_*_board in (sort_key, pos) order; SQLite merges the two
+        sql = (f"SELECT sort_key, 0, pos, body FROM records WHERE {BOARD}"
+               f" UNION ALL SELECT sort_key, 1, pos, body FROM approved WHERE {BOARD}"
+               " ORDER BY 1, 2, 3")
+        if k is not None:
+            sql += " LIMIT ?"
+            args += args + (k,)
+        else:
+            args += args
+        return [json.loads(body) for (_k, _src, _pos, body) in self._query(sql, args)]
+
+    def migrate_from_json(self) -> int:
+        """One-shot import of submissions.json. Returns the number of records copied."""
+        data = None
+        if self.json_path and os.path.exists(self.json_path):
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        count = 0
+        if data:
+            self.save(data)
+            count = sum(len(data.get(t, [])) for t in TABLES)
+        with self._lock, self._wr:
+            self._wr.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', ?)", (self.json_path or "",))
+        return count
+
+
+def main(argv=None) -> int:
+    # One-shot migration: python -m cogs.sqlite_store
+    from . import util
+    FP_DB, FP_SUB = util.FP_DB, util.FP_SUB
+    ap = argparse.ArgumentParser(description="Import wr_data/submissions.json into the SQLite backend.")
+    ap.add_argument("--force", action="store_true",
+                    help="re-import even though the database was already migrated (replaces its contents)")
+    args = ap.parse_args(argv)
+    # With WR_STORAGE=sqlite, importing util already opened (and maybe migrated) the database
+    backend = util.store.backends["subs"] if util.STORAGE == "sqlite" else \
+        SqliteBackend(FP_DB, json_path=FP_SUB, sort_key=util.record_sort_key)
+    if backend.migrated is not None:
+        print(f"Migrated {backend.migrated} records from {FP_SUB} into {FP_DB}.")
+    elif args.force:
+        print(f"Replaced {FP_DB} with {backend.migrate_from_json()} records from {FP_SUB}.")
+    else:
+        print(f"{FP_DB} was already migrated; nothing done. Pass --force to replace it with {FP_SUB}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,10 @@
 # cogs/submission.py
-import asyncio
 import discord
 from discord.ext import commands
 from discord import app_commands
 from typing import Optional, List
-from .util import subs, save_subs
+from .util import upsert_panel, enqueue_submission, attach_pending_message, parse_value, category_index, channel_map
+from .metrics import timed
 
 class SubmissionView(discord.ui.View):
     def __init__(self, cog: "SubmissionCog"):
@@ -12,10 +12,12 @@ class SubmissionView(discord.ui.View):
         self.cog = cog
 
     @discord.ui.button(label="Submit Run (Solo)", style=discord.ButtonStyle.primary, custom_id="wr_submit_solo")
+    @timed("wr_submit_solo")
     async def solo(self, i: discord.Interaction, b: discord.ui.Button):
         await self.cog.start_solo_flow(i)
 
     @discord.ui.button(label="Submit Run (Team)", style=discord.ButtonStyle.secondary, custom_id="wr_submit_team")
+    @timed("wr_submit_team")
     async def team(self, i: discord.Interaction, b: discord.ui.Button):
         await self.cog.start_team_flow(i)
 
@@ -30,9 +32,93 @@ class TeamSizeSelect(discord.ui.Select):
         self.cog = cog
 
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True)
         await self.cog.collect_team_players(interaction, int(self.values[0]))
 
+class RunSetupView(discord.ui.View):
+    """Ephemeral step before the modal: pick the runner/team, then Time or Damage."""
+    def __init__(self, cog: "SubmissionCog", submitter: discord.abc.User, size: int):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.size = size
+        self.players: Optional[List[int]] = [submitter.id] if size == 1 else None
+        self.picker = discord.ui.UserSelect(
+            placeholder=(f"Select runner (default: {submitter.display_name})" if size == 1 else f"Pick exactly {size} players"),
+            min_values=size, max_values=size, row=0
+        )
+        self.picker.callback = self._picked
+        self.add_item(self.picker)
+
+    async def _picked(self, i: discord.Interaction):
+        self.players = [u.id for u in self.picker.values]
+        await i.response.defer()
+
+    @discord.ui.button(label="Time", emoji="⏱️", style=discord.ButtonStyle.primary, row=1)
+    async def time(self, i: discord.Interaction, b: discord.ui.Button):
+        await self._open(i, "time")
+
+    @discord.ui.button(label="Damage", emoji="💥", style=discord.ButtonStyle.primary, row=1)
+    async def damage(self, i: discord.Interaction, b: discord.ui.Button):
+        await self._open(i, "damage")
+
+    async def _open(self, i: discord.Interaction, metric: str):
+        if not self.players or len(self.players) != self.size:
+            await i.response.send_message(f"{i.client.brand_prefix} You must select exactly {self.size}.", ephemeral=True)
+            return
+        await i.response.send_modal(RunModal(self, list(self.players), metric))
+
+class RunModal(discord.ui.Modal):
+    """Value + notes in one form. An invalid value leaves the setup view up, so the button can be pressed again."""
+    def __init__(self, setup: RunSetupView, players: List[int], metric: str):
+        size = setup.size
+        mode = "Solo" if size == 1 else f"{size}p Team"
+        super().__init__(title=f"{mode} · {'Time' if metric=='time' else 'Damage'}")
+        self.setup = setup
+        self.cog = setup.cog
+        self.size = size
+        self.players = players
+        self.metric = metric
+        self.value = discord.ui.TextInput(
+            label=("Run time" if metric == "time" else "Damage"),
+            placeholder=("m:ss.ms, e.g. 12:34.56" if metric == "time" else "digits, e.g. 1,234,567"),
+            max_length=32
+        )
+        self.notes = discord.ui.TextInput(label="Notes (optional)", style=discord.TextStyle.paragraph, required=False, max_length=500)
+        self.add_item(self.value)
+        self.add_item(self.notes)
+
+    @timed("submit_modal", kind="modal")
+    async def on_submit(self, i: discord.Interaction):
+        if self.setup.is_finished():  # a second modal opened before the first was submitted
+            await i.response.send_message(f"{i.client.brand_prefix} This run was already submitted.", ephemeral=True)
+            return
+        val = self.value.value.strip()
+        num = parse_value(self.metric, val)
+        if num is None:
+            msg = ("⚠️ That isn't a valid time. Use `m:ss.ms` (e.g., 12:34.56) and try again." if self.metric == "time"
+                   else "⚠️ That isn't a valid number. Enter the damage as digits (e.g., 1,234,567) and try again.")
+            await i.response.send_message(f"{i.client.brand_prefix} {msg}", ephemeral=True)
+            return
+        # A deferred update: the original response is the setup message, closed below
+        await i.response.defer()
+        record = {
+            "guild_id": i.guild_id,
+            "submitter_id": i.user.id,
+            "mode": "Solo" if self.size == 1 else "Team",
+            "size": self.size,
+            "players": self.players,
+            "metric": self.metric,
+            "value": val,
+            "value_num": num,
+            "notes": self.notes.value.strip() or None,
+        }
+        await self.cog.enqueue(i, record)
+        # Submitted: drop the Time/Damage buttons so the run can't be filed twice
+        self.setup.stop()
+        try:
+            await i.edit_original_response(view=None)
+        except discord.HTTPException:
+            pass  # setup message already dismissed
+
 class SubmissionCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -41,133 +127,25 @@ class SubmissionCog(commands.Cog):
         e = discord.Embed(
             title="[WR SUBMISSION BOX]",
             description=("Use the buttons to submit a run.\n"
-                         "• **Solo**: pick runner (auto-fills you), choose **Time** or **Damage**, enter value, optional **Notes**.\n"
-                         "• **Team**: choose 2p/3p/4p, pick players, choose **Time**/**Damage**, enter value, optional **Notes**."),
+                         "• **Solo**: pick runner (auto-fills you), choose **Time** or **Damage**, then fill in the value and optional **Notes**.\n"
+                         "• **Team**: choose 2p/3p/4p, pick players, choose **Time**/**Damage**, then fill in the value and optional **Notes**."),
             color=self.bot.theme_color
         )
         e.set_footer(text="WR Bot · Submissions")
         return e
 
-    async def post_or_update_submission_box(self, guild: discord.Guild):
-        ch = discord.utils.get(guild.text_channels, name="wr-submissions")
+    async def post_or_update_submission_box(self, guild: discord.Guild, force: bool = False):
+        ch = channel_map.resolve(guild, "submissions", "wr-submissions")
         if not ch:
             return
         marker = "[WR SUBMISSION BOX]"
-        async for m in ch.history(limit=50):
-            if m.author == guild.me and m.embeds and m.embeds[0].title == marker:
-                await m.edit(embed=self.box_embed(), view=SubmissionView(self))
-                return
-        await ch.send(embed=self.box_embed(), view=SubmissionView(self))
-
-    async def _prompt(self, interaction: discord.Interaction, prompt: str, timeout=120) -> Optional[str]:
-        await interaction.followup.send(f"{self.bot.brand_prefix} {prompt}", ephemeral=True)
-        def check(m: discord.Message):
-            return m.author.id == interaction.user.id and m.channel.id == interaction.channel.id
-        try:
-            msg = await self.bot.wait_for("message", check=check, timeout=timeout)
-            content = msg.content.strip()
-            try: await msg.delete()
-            except: pass
-            return content
-        except asyncio.TimeoutError:
-            await interaction.followup.send(f"{self.bot.brand_prefix} Timed out.", ephemeral=True)
-            return None
-
-    async def _choose_metric(self, interaction: discord.Interaction) -> Optional[str]:
-        class Metric(discord.ui.Select):
-            def __init__(self):
-                opts = [
-                    discord.SelectOption(label="Time", value="time", emoji="⏱️"),
-                    discord.SelectOption(label="Damage", value="damage", emoji="💥"),
-                ]
-                super().__init__(placeholder="Time or Damage?", options=opts, min_values=1, max_values=1, custom_id="wr_metric")
-                self.choice = None
-
-            async def callback(self, i: discord.Interaction):
-                self.choice = self.values[0]
-                await i.response.edit_message(
-                    content=f"{i.client.brand_prefix} ✅ Selected **{'Time' if self.choice=='time' else 'Damage'}**.",
-                    view=None
-                )
-                self.view.stop()
-
-        v = discord.ui.View(timeout=60); msel = Metric(); v.add_item(msel)
-        await interaction.followup.send(f"{self.bot.brand_prefix} Choose **Time** or **Damage**.", view=v, ephemeral=True)
-        await v.wait()
-        return msel.choice
-
-    async def _choose_user(self, interaction: discord.Interaction, default: discord.Member) -> Optional[int]:
-        class One(discord.ui.UserSelect):
-            def __init__(self):
-                super().__init__(
-                    placeholder=f"Select runner (default: {default.display_name})",
-                    min_values=1,
-                    max_values=1,
-                    custom_id="wr_one_user"
-                )
-                self.chosen: Optional[int] = None
-
-            async def callback(self, i: discord.Interaction):
-                self.chosen = self.values[0].id
-                await i.response.edit_message(
-                    content=f"{i.client.brand_prefix} ✅ Selected runner: {self.values[0].display_name}",
-                    view=None
-                )
-                self.view.stop()
-
-        v = discord.ui.View(timeout=60); sel = One(); v.add_item(sel)
-        await interaction.followup.send(f"{self.bot.brand_prefix} Choose the **runner**.", view=v, ephemeral=True)
-        await v.wait()
-        return sel.chosen or default.id
-
-    async def _choose_users(self, interaction: discord.Interaction, size: int) -> Optional[List[int]]:
-        class Many(discord.ui.UserSelect):
-            def __init__(self):
-                super().__init__(
-                    placeholder=f"Pick exactly {size} players",
-                    min_values=size,
-                    max_values=size,
-                    custom_id="wr_many_users"
-                )
-                self.chosen: Optional[List[int]] = None
-
-            async def callback(self, i: discord.Interaction):
-                self.chosen = [u.id for u in self.values]
-                await i.response.edit_message(
-                    content=f"{i.client.brand_prefix} ✅ Selected team: {', '.join(u.display_name for u in self.values)}",
-                    view=None
-                )
-                self.view.stop()
-
-        v = discord.ui.View(timeout=120); sel = Many(); v.add_item(sel)
-        await interaction.followup.send(f"{self.bot.brand_prefix} Pick **{size} players** for the team.", view=v, ephemeral=True)
-        await v.wait()
-        if sel.chosen and len(sel.chosen) == size:
-            return sel.chosen
-        await interaction.followup.send(f"{self.bot.brand_prefix} You must select exactly {size}.", ephemeral=True)
-        return None
+        await upsert_panel(guild, ch, "submission", marker, force=force, embed=self.box_embed(), view=SubmissionView(self))
 
     async def start_solo_flow(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True, thinking=True)
-        runner = await self._choose_user(interaction, interaction.user)
-        if not runner: return
-        metric = await self._choose_metric(interaction)
-        if not metric: return
-        val = await self._prompt(interaction, "Enter your **run time** (e.g., 12:34.56)." if metric=="time" else "Enter your **damage** (number).")
-        if not val: return
-        notes = await self._prompt(interaction, "Add **notes** (optional). Type `skip` to leave blank.")
-        if notes and notes.lower() == "skip": notes = None
-        record = {
-            "guild_id": interaction.guild_id,
-            "submitter_id": interaction.user.id,
-            "mode": "Solo",
-            "size": 1,
-            "players": [runner],
-            "metric": metric,
-            "value": val,
-            "notes": notes,
-        }
-        await self.enqueue(interaction, record)
+        await interaction.response.send_message(
+            f"{self.bot.brand_prefix} Pick the **runner** (defaults to you), then choose **Time** or **Damage**.",
+            view=RunSetupView(self, interaction.user, 1), ephemeral=True
+        )
 
     async def start_team_flow(self, interaction: discord.Interaction):
         await interaction.response.send_message(f"{self.bot.brand_prefix} Choose **team size**.", view=self._team_size_view(), ephemeral=True)
@@ -176,37 +154,25 @@ class SubmissionCog(commands.Cog):
         v = discord.ui.View(timeout=60); v.add_item(TeamSizeSelect(self)); return v
 
     async def collect_team_players(self, interaction: discord.Interaction, size: int):
-        players = await self._choose_users(interaction, size)
-        if not players: return
-        metric = await self._choose_metric(interaction)
-        if not metric: return
-        val = await self._prompt(interaction, "Enter your **team time** (e.g., 12:34.56)." if metric=="time" else "Enter your **team damage** (number).")
-        if not val: return
-        notes = await self._prompt(interaction, "Add **notes** (optional). Type `skip` to leave blank.")
-        if notes and notes.lower() == "skip": notes = None
-        record = {
-            "guild_id": interaction.guild_id,
-            "submitter_id": interaction.user.id,
-            "mode": "Team",
-            "size": size,
-            "players": players,
-            "metric": metric,
-            "value": val,
-            "notes": notes,
-        }
-        await self.enqueue(interaction, record)
+        await interaction.response.edit_message(
+            content=f"{self.bot.brand_prefix} Pick **{size} players**, then choose **Time** or **Damage**.",
+            view=RunSetupView(self, interaction.user, size)
+        )
 
     async def enqueue(self, interaction: discord.Interaction, record: dict):
-        data = subs()
-        data["pending"].append(record)
-        save_subs(data)
-        ch = discord.utils.get(interaction.guild.text_channels, name=interaction.client.canonical_channels["pending"])
+        record = await enqueue_submission(record)
+        ch = channel_map.resolve(interaction.guild, "pending", interaction.client.canonical_channels["pending"])
         from .approval import ApprovalView
         embed = self.to_embed(interaction.guild, record, pending=True)
         msg = await ch.send(embed=embed, view=ApprovalView(interaction.client))
-        record["pending_message_id"] = msg.id
-        save_subs(data)
-        await interaction.followup.send(f"{self.bot.brand_prefix} 🏆 Submitted for review.", ephemeral=True)
+        await attach_pending_message(record["submission_id"], msg.id)
+        rank = category_index.would_rank(record)
+        await interaction.followup.send(
+            f"{self.bot.brand_prefix} 🏆 Submitted for review. If approved, this run would rank **#{rank}** "
+            f"in {record['mode'] if record['mode']=='Solo' else str(record['size']) + 'p Team'} "
+            f"{'time' if record['metric']=='time' else 'damage'}.",
+            ephemeral=True
+        )
 
     def to_embed(self, guild: discord.Guild, rec: dict, pending=False) -> discord.Embed:
         e = discord.Embed(title=("Pending WR" if pending else "Approved WR"), color=self.bot.theme_color)
@@ -227,7 +193,7 @@ class SubmissionCog(commands.Cog):
     @app_commands.command(name="setup-submission-box", description="Post the WR submission UI in this server")
     @app_commands.checks.has_permissions(administrator=True)
     async def setup_submission_box(self, interaction: discord.Interaction):
-        await self.post_or_update_submission_box(interaction.guild)
+        await self.post_or_update_submission_box(interaction.guild, force=True)
         await interaction.response.send_message("Submission box posted/updated.", ephemeral=True)
 
 async def setup(bot: commands.Bot):
@@ -1,11 +1,26 @@
 # cogs/util.py
-import os, json, discord
-from typing import Dict, Any, List, Tuple
+import os, re, json, math, uuid, bisect, hashlib, asyncio, logging, threading, discord
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple, Callable, Iterable, Optional
+from .metrics import perf
 
 DATA_DIR = "wr_data"
 FP_CFG = os.path.join(DATA_DIR, "config.json")
 FP_SUB = os.path.join(DATA_DIR, "submissions.json")
 FP_PIN = os.path.join(DATA_DIR, "pins.json")
+FP_DB = os.path.join(DATA_DIR, "submissions.sqlite3")
+FP_SYNC = os.path.join(DATA_DIR, "command_sync.json")
+FP_JOURNAL = os.path.join(DATA_DIR, "submissions.journal.jsonl")
+FP_NAMES = os.path.join(DATA_DIR, "names.json")
+
+# "json" (default) keeps submissions in submissions.json; "sqlite" keeps them in
+# submissions.sqlite3, migrating the JSON file on first start; "journal" keeps
+# submissions.json as a snapshot and appends each change to a JSON-lines journal.
+STORAGE = os.getenv("WR_STORAGE", "json").lower()
+# Journal mode: fsync after every group commit ("always") or leave it to the OS ("never")
+JOURNAL_FSYNC = os.getenv("WR_JOURNAL_FSYNC", "always").lower() != "never"
+# Journal mode: compact into a new snapshot once the journal passes this many bytes
+JOURNAL_COMPACT_BYTES = int(os.getenv("WR_JOURNAL_COMPACT_BYTES", str(8 * 1024 * 1024)))
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -17,17 +32,168 @@ def _load(path: str, default: Any) -> Any:
         return default
 
 def _save(path: str, data: Any):
-    with open(path, "w", encoding="utf-8") as f:
+    # Write to a temp file and rename over the target so a crash mid-write
+    # never leaves a truncated JSON file behind.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class JsonFile:
+    """Storage backend for one wr_data/*.json file."""
+
+    def __init__(self, path: str, default: Callable[[], Any]):
+        self.path = path
+        self.default = default
+
+    def load(self) -> Any:
+        return _load(self.path, self.default())
+
+    def save(self, data: Any):
+        _save(self.path, data)
+
+def _json_copy(data: Any) -> Any:
+    """Private copy of JSON-shaped data (nested dicts/lists), for a writer thread to own."""
+    if type(data) is dict:
+        return {k: _json_copy(v) for k, v in data.items()}
+    if type(data) is list:
+        return [_json_copy(v) for v in data]
+    return data
+
+class _Writer:
+    """In-order, coalescing writer for one file; threads get a snapshot they own."""
+
+    def __init__(self, backend, name: str, snapshot: Callable[[Any], Any] = _json_copy):
+        self.backend = backend
+        self.name = name
+        self.snapshot = snapshot
+        self.written = 0
+        self._lock = asyncio.Lock()
+        self._io = threading.Lock()
+        self._latest: Optional[Tuple[int, Any]] = None
+
+    def save_now(self, version: int, data: Any):
+        """Write `data` as `version` in the calling thread, unless something newer is already on disk."""
+        with self._io:
+            if self.written >= version:
+                return
+            with perf.timer("storage", f"save:{self.name}"):
+                self.backend.save(data)
+            self.written = version
+        if self._latest is not None and self._latest[0] <= version:
+            self._latest = None
+
+    async def write(self, version: int, data: Any):
+        if self._latest is None or version > self._latest[0]:
+            self._latest = (version, self.snapshot(data))
+        async with self._lock:
+            if self.written >= version or self._latest is None:
+                return  # a later save already covered this one
+            version, data = self._latest
+            self._latest = None
+            await asyncio.to_thread(self.save_now, version, data)
+
+    async def append(self, version: int, ops: List[Dict[str, Any]]):
+        """Append `ops` to a journaling backend, ordered with snapshot writes."""
+        ops = self.snapshot(ops)
+        async with self._lock:
+            await asyncio.to_thread(self._append, version, ops)
+
+    def _append(self, version: int, ops: List[Dict[str, Any]]):
+        with self._io:
+            with perf.timer("storage", f"append:{self.name}"):
+                self.backend.append(ops)
+            self.written = max(self.written, version)
+
+class Store:
+    """Process-wide in-memory view of the bot's data files, written through to their backends."""
+
+    def __init__(self, backends: Dict[str, Any], upgrades: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                 snapshots: Optional[Dict[str, Callable[[Any], Any]]] = None):
+        self.backends = backends
+        # key -> in-place data migration run once right after each load
+        self.upgrades = upgrades or {}
+        self._data: Dict[str, Any] = {}
+        self.version = 0
+        self.versions: Dict[str, int] = {key: 0 for key in backends}
+        # key -> how its writer thread gets data it owns (default: a deep copy)
+        snapshots = snapshots or {}
+        self._writers = {key: _Writer(b, key, snapshots.get(key, _json_copy)) for key, b in backends.items()}
+
+    def get(self, key: str) -> Any:
+        if key not in self._data:
+            self._data[key] = self._load(key)
+        return self._data[key]
+
+    def _load(self, key: str) -> Any:
+        with perf.timer("storage", f"load:{key}"):
+            data = self.backends[key].load()
+            if key in self.upgrades:
+                self.upgrades[key](data)
+        return data
+
+    def put(self, key: str, data: Any):
+        self._writers[key].save_now(self._bump(key, data), data)
+
+    async def load_async(self):
+        """Parse every file not yet in memory, off the event loop."""
+        missing = [key for key in self.backends if key not in self._data]
+        loaded = await asyncio.gather(*(asyncio.to_thread(self._load, key) for key in missing))
+        for key, data in zip(missing, loaded):
+            self._data.setdefault(key, data)
+
+    async def put_async(self, key: str, data: Any):
+        """Like put(), but serialization and the disk write happen in a thread."""
+        await self._writers[key].write(self._bump(key, data), data)
+
+    async def commit_async(self, key: str, data: Any, ops: List[Dict[str, Any]]):
+        """Persist `data` after `ops` were applied: appended if the backend journals, else a full save."""
+        version = self._bump(key, data)
+        if hasattr(self.backends[key], "append"):
+            await self._writers[key].append(version, ops)
+        else:
+            await self._writers[key].write(version, data)
+
+    def needs_compaction(self, key: str) -> bool:
+        check = getattr(self.backends[key], "needs_compaction", None)
+        return bool(check and check())
+
+    def _bump(self, key: str, data: Any) -> int:
+        self._data[key] = data
+        self.version += 1
+        self.versions[key] = self.version
+        return self.version
+
+    def reload(self, key: Optional[str] = None):
+        """Drop the cached copy (of one file or all) so the next read hits disk."""
+        for k in ([key] if key else list(self._data)):
+            if self._data.pop(k, None) is not None:
+                self.version += 1
+                self.versions[k] = self.version
+
+def _subs_backend():
+    if STORAGE == "sqlite":
+        from .sqlite_store import SqliteBackend
+        return SqliteBackend(FP_DB, json_path=FP_SUB, sort_key=record_sort_key)
+    if STORAGE == "journal":
+        from .journal import JournalBackend
+        return JournalBackend(
+            FP_SUB, FP_JOURNAL, lambda: {"pending": [], "approved": [], "records": []},
+            apply=lambda data, op: apply_op(data, op),
+            fsync=JOURNAL_FSYNC, compact_bytes=JOURNAL_COMPACT_BYTES,
+        )
+    return JsonFile(FP_SUB, lambda: {"pending": [], "approved": [], "records": []})
 
 def cfg() -> Dict[str, Any]:
-    return _load(FP_CFG, {"guilds": {}})
+    return store.get("cfg")
 
 def set_channel_id(guild_id: int, key: str, value: int):
     c = cfg()
     g = c["guilds"].setdefault(str(guild_id), {"channels": {}, "roles": {}})
     g["channels"][key] = value
-    _save(FP_CFG, c)
+    store.put("cfg", c)
 
 def get_channel_id(guild_id: int, key: str) -> int:
     return cfg().get("guilds", {}).get(str(guild_id), {}).get("channels", {}).get(key, 0)
@@ -36,22 +202,35 @@ def set_role_id(guild_id: int, name: str, rid: int):
     c = cfg()
     g = c["guilds"].setdefault(str(guild_id), {"channels": {}, "roles": {}})
     g["roles"][name] = rid
-    _save(FP_CFG, c)
+    store.put("cfg", c)
 
 def get_role_id(guild_id: int, name: str) -> int:
     return cfg().get("guilds", {}).get(str(guild_id), {}).get("roles", {}).get(name, 0)
 
 def subs() -> Dict[str, Any]:
-    return _load(FP_SUB, {"pending": [], "approved": [], "records": []})
+    return store.get("subs")
 
 def save_subs(data: Dict[str, Any]):
-    _save(FP_SUB, data)
+    store.put("subs", data)
+
+async def save_subs_async(data: Dict[str, Any]):
+    await mutations.save(data)
 
 def pins() -> Dict[str, Any]:
-    return _load(FP_PIN, {})
+    return store.get("pins")
 
 def save_pins(data: Dict[str, Any]):
-    _save(FP_PIN, data)
+    store.put("pins", data)
+
+async def save_pins_async(data: Dict[str, Any]):
+    await store.put_async("pins", data)
+
+def command_sync_state() -> Dict[str, str]:
+    """Scope ("global" or a guild id) -> fingerprint of the last synced command tree."""
+    return store.get("sync")
+
+async def save_command_sync_state(data: Dict[str, str]):
+    await store.put_async("sync", data)
 
 def time_to_sort_key(s: str) -> float:
     try:
@@ -69,19 +248,689 @@ def damage_to_sort_key(s: str) -> float:
     except:
         return 0.0
 
+_TIME_PART = re.compile(r"\d+(?:\.\d*)?|\.\d+")
+
+def parse_time_ms(s: str) -> Optional[int]:
+    """Parse "[[h:]m:]s[.fff]" into milliseconds, or None if it isn't a valid time."""
+    parts = [p.strip() for p in str(s).strip().split(":")]
+    # Plain decimals only: float() would also take "inf", "nan" and "1e3"
+    if not 1 <= len(parts) <= 3 or not all(_TIME_PART.fullmatch(p) for p in parts):
+        return None
+    nums = [float(p) for p in parts]
+    if any(n >= 60 for n in nums[1:]):
+        return None
+    total = 0.0
+    for n in nums:
+        total = total*60 + n
+    if not math.isfinite(total):  # a few hundred digits still overflow to inf
+        return None
+    return round(total * 1000)
+
+_DAMAGE = re.compile(r"\d{1,3}(?:,\d{3})*|\d+")
+MAX_DAMAGE = 10**15  # well under 2**53, so it's exact as a float and fits SQLite INTEGER
+
+def parse_damage(s: str) -> Optional[int]:
+    """Parse a damage number ("1,234,567" / "1234567") into an int, or None."""
+    s = str(s).strip()
+    # Whole digits only: float() would also take "1e308", "inf" and fractions
+    if not _DAMAGE.fullmatch(s):
+        return None
+    n = int(s.replace(",", ""))
+    return n if 0 < n <= MAX_DAMAGE else None
+
+def parse_value(metric: str, s: str) -> Optional[int]:
+    """Canonical numeric value for a submission: ms for time, int for damage."""
+    return parse_time_ms(s) if metric == "time" else parse_damage(s)
+
+def record_sort_key(rec: Dict[str, Any]) -> float:
+    """Ascending sort key for a record: time in ms as-is, damage negated."""
+    num = rec.get("value_num")
+    if rec.get("metric") == "time":
+        return num if num is not None else time_to_sort_key(rec.get("value")) * 1000
+    return -(num if num is not None else damage_to_sort_key(rec.get("value")))
+
+def backfill_value_nums(data: Dict[str, Any]) -> int:
+    """Give every record missing `value_num` its parsed value (unparseable ones sort last). Returns how many changed."""
+    changed = 0
+    for key in ("pending", "approved", "records"):
+        for rec in data.get(key, []):
+            if "value_num" in rec:
+                continue
+            num = parse_value(rec.get("metric"), rec.get("value"))
+            if num is None:
+                num = round(9e12) if rec.get("metric") == "time" else 0
+            rec["value_num"] = num
+            changed += 1
+    return changed
+
+store = Store({
+    "cfg":  JsonFile(FP_CFG, lambda: {"guilds": {}}),
+    "subs": _subs_backend(),
+    "pins": JsonFile(FP_PIN, lambda: {}),
+    "sync": JsonFile(FP_SYNC, lambda: {}),
+    "names": JsonFile(FP_NAMES, lambda: {}),
+}, upgrades={"subs": backfill_value_nums},
+   # Submissions are too big to copy per write (seconds at 1M records). They're
+   # only changed by MutationQueue, which holds its lock until the write that
+   # covers a change is done, so the writer thread can use them as they are.
+   snapshots={"subs": lambda data: data})
+
+def new_submission_id() -> str:
+    return uuid.uuid4().hex
+
+class PendingIndex:
+    """O(1) lookup and swap-removal of pending submissions by submission id and message id."""
+
+    def __init__(self):
+        self._data: Optional[Dict[str, Any]] = None
+        self._pos: Dict[str, int] = {}
+        self._by_msg: Dict[int, str] = {}
+
+    def rebuild(self, data: Dict[str, Any]):
+        self._data = data
+        self._pos.clear()
+        self._by_msg.clear()
+        for pos, rec in enumerate(data.setdefault("pending", [])):
+            self._track(rec, pos)
+
+    def _sync(self, data: Dict[str, Any]):
+        if self._data is not data:
+            self.rebuild(data)
+
+    def _track(self, rec: Dict[str, Any], pos: int):
+        sid = rec.setdefault("submission_id", new_submission_id())
+        self._pos[sid] = pos
+        if rec.get("pending_message_id"):
+            self._by_msg[rec["pending_message_id"]] = sid
+
+    def _at(self, data: Dict[str, Any], sid: str) -> Optional[int]:
+        pending = data["pending"]
+        pos = self._pos.get(sid)
+        if pos is not None and pos < len(pending) and pending[pos].get("submission_id") == sid:
+            return pos
+        return None
+
+    def append(self, data: Dict[str, Any], rec: Dict[str, Any]):
+        self._sync(data)
+        data["pending"].append(rec)
+        self._track(rec, len(data["pending"]) - 1)
+
+    def get(self, data: Dict[str, Any], sid: str) -> Optional[Dict[str, Any]]:
+        self._sync(data)
+        pos = self._at(data, sid)
+        return data["pending"][pos] if pos is not None else None
+
+    def attach(self, data: Dict[str, Any], rec: Dict[str, Any], message_id: int):
+        """Record that `rec` was posted for review as `message_id`."""
+        self._sync(data)
+        rec["pending_message_id"] = message_id
+        self._by_msg[message_id] = rec["submission_id"]
+
+    def find(self, data: Dict[str, Any], message_id: int) -> Optional[Dict[str, Any]]:
+        self._sync(data)
+        sid = self._by_msg.get(message_id)
+        if sid is None:
+            return None
+        pos = self._at(data, sid)
+        if pos is None:
+            # The list changed behind our back; resync once.
+            self.rebuild(data)
+            pos = self._at(data, sid)
+        return data["pending"][pos] if pos is not None else None
+
+    def pop(self, data: Dict[str, Any], rec: Dict[str, Any]):
+        self._sync(data)
+        sid = rec["submission_id"]
+        pos = self._at(data, sid)
+        if pos is None:
+            self.rebuild(data)
+            pos = self._at(data, sid)
+            if pos is None:
+                return
+        pending = data["pending"]
+        last = pending.pop()
+        if pos < len(pending):
+            pending[pos] = last
+            self._pos[last["submission_id"]] = pos
+        del self._pos[sid]
+        self._by_msg.pop(rec.get("pending_message_id"), None)
+
+pending_index = PendingIndex()
+
+# Seconds to collect submission mutations into one durable write
+COMMIT_WINDOW = float(os.getenv("WR_COMMIT_WINDOW", "0.05"))
+
+def apply_op(data: Dict[str, Any], op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Apply one enqueue/attach/approve/reject op to `data`; returns the record it touched, or None if it's gone."""
+    kind = op["op"]
+    if kind == "enqueue":
+        pending_index.append(data, op["rec"])
+        return op["rec"]
+    if kind == "attach":
+        rec = pending_index.get(data, op["submission_id"])
+        if rec:
+            pending_index.attach(data, rec, op["message_id"])
+        return rec
+    if kind in ("approve", "reject"):
+        rec = pending_index.find(data, op["message_id"])
+        if rec:
+            pending_index.pop(data, rec)
+            if kind == "approve":
+                data.setdefault("approved", []).append(rec)
+                if wr_counts.built:
+                    wr_counts.add(rec)
+                if category_index.built:
+                    category_index.add(rec)
+        return rec
+    raise ValueError(f"Unknown submission op: {kind}")
+
+class MutationQueue:
+    """Applies submission ops in arrival order and group-commits each `window`; a failed write is rolled back."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._queue: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._compactor: Optional[asyncio.Task] = None
+        # Held while a group is applied + committed, and while compacting
+        self._lock = asyncio.Lock()
+
+    async def submit(self, op: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.append((op, fut))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await fut
+
+    async def _run(self):
+        while self._queue:
+            await asyncio.sleep(self.window)
+            async with self._lock:
+                batch, self._queue = self._queue, []
+                await self._commit(batch)
+            if store.needs_compaction("subs") and (self._compactor is None or self._compactor.done()):
+                self._compactor = asyncio.create_task(self._compact())
+
+    async def _commit(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        data = subs()
+        applied, results = [], []
+        for op, fut in batch:
+            try:
+                results.append((fut, apply_op(data, op), None))
+                applied.append((op, fut))
+            except Exception as e:
+                results.append((fut, None, e))
+        try:
+            await store.commit_async("subs", data, [op for op, _f in applied])
+        except Exception as e:
+            logging.exception(f"Committing {len(applied)} submission op(s) failed: {e}")
+            self._rollback()
+            if len(applied) > 1:
+                # Retry one by one so only the op that can't be written fails
+                for item in applied:
+                    await self._commit([item])
+                results = [r for r in results if r[2]]
+            else:
+                results = [(fut, None, err or e) for fut, _r, err in results]
+        for fut, res, err in results:
+            if fut.done():
+                continue
+            if err:
+                fut.set_exception(err)
+            else:
+                fut.set_result(res)
+
+    def _rollback(self):
+        # Memory is ahead of disk after a failed write: reload what's durable.
+        # Synchronous on purpose, so nothing reads subs() half-restored.
+        category_index.built = False
+        wr_counts.built = False
+        store.reload("subs")
+        subs()
+
+    async def save(self, data: Dict[str, Any]):
+        """Full write of the submissions, with mutations held off until it's on disk."""
+        async with self._lock:
+            await store.put_async("subs", data)
+
+    async def _compact(self):
+        # Snapshot in the writer thread; new ops queue up until it's done.
+        try:
+            await self.save(subs())
+            logging.info("Compacted submissions journal into a new snapshot.")
+        except Exception as e:
+            logging.exception(f"Journal compaction failed: {e}")
+
+mutations = MutationQueue(COMMIT_WINDOW)
+
+async def enqueue_submission(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return await mutations.submit({"op": "enqueue", "rec": rec})
+
+async def attach_pending_message(submission_id: str, message_id: int) -> Optional[Dict[str, Any]]:
+    return await mutations.submit({"op": "attach", "submission_id": submission_id, "message_id": message_id})
+
+async def approve_pending(message_id: int) -> Optional[Dict[str, Any]]:
+    """Move the pending record posted as `message_id` to approved. None if it's gone."""
+    return await mutations.submit({"op": "approve", "message_id": message_id})
+
+async def reject_pending(message_id: int) -> Optional[Dict[str, Any]]:
+    """Drop the pending record posted as `message_id`. None if it's gone."""
+    return await mutations.submit({"op": "reject", "message_id": message_id})
+
+class CategoryIndex:
+    """Sorted leaderboards per (guild, metric, mode, size, season); ties keep arrival order."""
+
+    def __init__(self):
+        self.built = False
+        self._keys: Dict[tuple, List[float]] = {}
+        self._recs: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._seasons: Dict[int, int] = {}
+
+    @staticmethod
+    def category(rec: Dict[str, Any]) -> tuple:
+        try:
+            size = int(rec.get("size", 1))
+        except (TypeError, ValueError):
+            size = 1
+        return (rec.get("guild_id"), rec.get("metric"), rec.get("mode"), size, rec.get("season", 1))
+
+    def rebuild(self, data: Dict[str, Any]):
+        self._keys.clear()
+        self._recs.clear()
+        self._seasons.clear()
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for rec in data.get("records", []) + data.get("approved", []):
+            groups.setdefault(self.category(rec), []).append(rec)
+        for cat, recs in groups.items():
+            recs.sort(key=record_sort_key)  # stable: ties keep records-then-approved order
+            self._recs[cat] = recs
+            self._keys[cat] = [record_sort_key(rec) for rec in recs]
+            gid, season = cat[0], cat[4]
+            if season > self._seasons.get(gid, 0):
+                self._seasons[gid] = season
+        self.built = True
+
+    def ensure(self):
+        if not self.built:
+            self.rebuild(subs())
+
+    def add(self, rec: Dict[str, Any]):
+        cat = self.category(rec)
+        keys = self._keys.setdefault(cat, [])
+        key = record_sort_key(rec)
+        pos = bisect.bisect_right(keys, key)
+        keys.insert(pos, key)
+        self._recs.setdefault(cat, []).insert(pos, rec)
+        gid, season = cat[0], cat[4]
+        if season > self._seasons.get(gid, 0):
+            self._seasons[gid] = season
+
+    def current_season(self, guild_id: int) -> int:
+        self.ensure()
+        return self._seasons.get(guild_id, 1)
+
+    def _cat(self, guild_id: int, metric: str, mode: str, size: int, season: str) -> tuple:
+        self.ensure()
+        sel = self.current_season(guild_id) if season == "current" else int(season)
+        return (guild_id, metric, mode, size, sel)
+
+    def top(self, guild_id: int, metric: str, mode: str, size: int, season: str = "current", k: Optional[int] = None) -> List[Dict[str, Any]]:
+        recs = self._recs.get(self._cat(guild_id, metric, mode, size, season), [])
+        return recs[:k] if k is not None else list(recs)
+
+    def rank_of(self, rec: Dict[str, Any]) -> int:
+        """1-based rank of `rec`'s value among approved runs (ties share a rank)."""
+        self.ensure()
+        return bisect.bisect_left(self._keys.get(self.category(rec), []), record_sort_key(rec)) + 1
+
+    def would_rank(self, rec: Dict[str, Any]) -> int:
+        """Rank a new run with `rec`'s value would take if approved now (behind equal runs)."""
+        self.ensure()
+        return bisect.bisect_right(self._keys.get(self.category(rec), []), record_sort_key(rec)) + 1
+
+category_index = CategoryIndex()
+
 def leaderboard_slice(guild_id: int, metric: str, mode: str, size: int, season: str = "current"):
-    data = subs()
-    # simple season model: max season present, else 1
-    seasons = [r.get("season", 1) for r in data["records"] if r.get("guild_id")==guild_id]
-    cur = max(seasons) if seasons else 1
-    sel = cur if season == "current" else int(season)
-    rs = [r for r in data["records"] if r.get("guild_id")==guild_id and r.get("metric")==metric and r.get("mode")==mode and int(r.get("size",1))==size and r.get("season",1)==sel]
-    if metric == "time":
-        rs.sort(key=lambda r: time_to_sort_key(r.get("value")))
-    else:
-        rs.sort(key=lambda r: damage_to_sort_key(r.get("value")), reverse=True)
-    return rs
+    """Ranked runs for one category; season "current" is the guild's latest (else 1)."""
+    backend = store.backends["subs"]
+    if hasattr(backend, "leaderboard"):
+        return backend.leaderboard(guild_id, metric, mode, size, season)
+    return category_index.top(guild_id, metric, mode, size, season)
+
+class WRCounts:
+    """Approved-WR totals and badge breakdowns per guild per player, kept in step with approvals."""
+
+    def __init__(self):
+        self.built = False
+        self._totals: Dict[int, Dict[int, int]] = {}
+        self._breakdown: Dict[int, Dict[int, Dict[Tuple[str, str], int]]] = {}
+
+    def rebuild(self, approved: List[Dict[str, Any]]):
+        self._totals.clear()
+        self._breakdown.clear()
+        for rec in approved:
+            self.add(rec)
+        self.built = True
+
+    def ensure(self):
+        if not self.built:
+            self.rebuild(subs().get("approved", []))
+
+    def add(self, rec: Dict[str, Any]):
+        gid = rec.get("guild_id")
+        totals = self._totals.setdefault(gid, {})
+        breakdown = self._breakdown.setdefault(gid, {})
+        for pid in rec.get("players", []):
+            totals[pid] = totals.get(pid, 0) + 1
+            cats = breakdown.setdefault(pid, {})
+            for key in (("mode", rec.get("mode")), ("metric", rec.get("metric"))):
+                cats[key] = cats.get(key, 0) + 1
+
+    def totals(self, guild_id: int) -> Dict[int, int]:
+        """Player id -> approved WR count. Treat as read-only."""
+        self.ensure()
+        return self._totals.get(guild_id, {})
+
+    def breakdown(self, guild_id: int, player_id: int) -> Dict[Tuple[str, str], int]:
+        self.ensure()
+        return self._breakdown.get(guild_id, {}).get(player_id, {})
+
+wr_counts = WRCounts()
+
+class NameCache:
+    """Per-guild LRU of player display names, falling back to the last-known name of players who left."""
+
+    def __init__(self, size: int = 5000):
+        self.size = size
+        self.version = 0
+        self._lru: Dict[int, "OrderedDict[int, Optional[str]]"] = {}
+
+    def name(self, guild: discord.Guild, user_id: int) -> Optional[str]:
+        """Display name for `user_id`, or None if we've never seen them."""
+        lru = self._lru.setdefault(guild.id, OrderedDict())
+        if user_id in lru:
+            lru.move_to_end(user_id)
+            return lru[user_id]
+        m = guild.get_member(user_id)
+        name = m.display_name if m else store.get("names").get(str(guild.id), {}).get(str(user_id))
+        if name is None:
+            return None
+        lru[user_id] = name
+        if len(lru) > self.size:
+            lru.popitem(last=False)
+        return name
+
+    def update(self, guild_id: int, user_id: int, name: Optional[str]):
+        lru = self._lru.get(guild_id)
+        if lru is not None and user_id in lru and lru[user_id] != name:
+            lru[user_id] = name
+            self.version += 1
+
+    def forget_user(self, user_id: int):
+        """Drop `user_id` everywhere (their global name changed)."""
+        for lru in self._lru.values():
+            if lru.pop(user_id, None) is not None:
+                self.version += 1
+
+    def joined(self, member: discord.Member):
+        """Drop any departed-name entry so the live display name is used from now on."""
+        lru = self._lru.get(member.guild.id)
+        if lru is not None:
+            lru.pop(member.id, None)
+        if wr_counts.totals(member.guild.id).get(member.id):
+            self.version += 1
+
+    async def departed(self, member: discord.Member):
+        """Remember the name of a record holder who left so the leaderboard can still show it."""
+        if not wr_counts.totals(member.guild.id).get(member.id):
+            return
+        names = store.get("names")
+        names.setdefault(str(member.guild.id), {})[str(member.id)] = member.display_name
+        self.update(member.guild.id, member.id, member.display_name)
+        await store.put_async("names", names)
+
+name_cache = NameCache()
+
+def panel_hash(**fields) -> str:
+    """Stable digest of a panel's message fields (content/embed/view)."""
+    payload = {}
+    for key, value in fields.items():
+        if isinstance(value, discord.Embed):
+            value = value.to_dict()
+        elif isinstance(value, discord.ui.View):
+            value = value.to_components()
+        payload[key] = value
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _pin(guild_id: int, panel: str) -> Dict[str, Any]:
+    entry = pins().get(str(guild_id), {}).get(panel)
+    if isinstance(entry, int):  # older pins.json stored the bare message id
+        entry = {"id": entry}
+    return entry or {}
+
+async def upsert_panel(guild: discord.Guild, ch: discord.TextChannel, panel: str, marker: str,
+                       force: bool = False, **fields) -> Optional[int]:
+    """Edit or post this guild's `panel` in `ch`; nothing is sent if its pin matches, unless `force`."""
+    digest = panel_hash(**fields)
+    entry = _pin(guild.id, panel)
+    mid = entry.get("id") if entry.get("channel") == ch.id else None
+    if mid and entry.get("hash") == digest and not force:
+        return mid
+
+    msg = None
+    if mid:
+        try:
+            msg = await ch.get_partial_message(mid).edit(**fields)
+        except discord.NotFound:
+            pass
+
+    if msg is None:
+        async for m in ch.history(limit=50):
+            if m.author == guild.me and m.embeds and m.embeds[0].title == marker:
+                msg = await m.edit(**fields)
+                break
+    if msg is None:
+        msg = await ch.send(**fields)
+    p = pins()
+    p.setdefault(str(guild.id), {})[panel] = {"id": msg.id, "channel": ch.id, "hash": digest}
+    await save_pins_async(p)
+    return msg.id
+
+async def _forget_panels(guild_id: int, match: Callable[[Dict[str, Any]], bool]):
+    gp = pins().get(str(guild_id), {})
+    stale = [panel for panel in gp if match(_pin(guild_id, panel))]
+    for panel in stale:
+        del gp[panel]
+    if stale:
+        await save_pins_async(pins())
+
+async def forget_panel_messages(guild_id: int, message_ids: Iterable[int]):
+    """Drop any cached panel entry pointing at one of these deleted messages."""
+    ids = set(message_ids)
+    await _forget_panels(guild_id, lambda entry: entry.get("id") in ids)
+
+async def forget_panel_channel(guild_id: int, channel_id: int):
+    """Drop cached panels in a deleted channel; Discord sends no per-message deletes for it."""
+    await _forget_panels(guild_id, lambda entry: entry.get("channel") == channel_id)
+
+class RefreshScheduler:
+    """Coalesces bursts of refresh requests per key into at most one pass in flight plus one after."""
+
+    def __init__(self, action: Callable[[Any], Any], delay: float):
+        self.action = action
+        self.delay = delay
+        self._waiters: Dict[Any, List[asyncio.Future]] = {}
+        self._args: Dict[Any, Any] = {}
+        self._tasks: Dict[Any, asyncio.Task] = {}
+
+    def request(self, key: Any, arg: Any) -> asyncio.Future:
+        """Schedule a pass for `key`. Await the result to wait for it to finish."""
+        fut = asyncio.get_running_loop().create_future()
+        # Fire-and-forget callers never look at the result; don't warn about it.
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._waiters.setdefault(key, []).append(fut)
+        self._args[key] = arg
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            self._tasks[key] = asyncio.create_task(self._run(key))
+        return fut
+
+    async def _run(self, key: Any):
+        while self._waiters.get(key):
+            await asyncio.sleep(self.delay)
+            waiters = self._waiters.pop(key, [])
+            try:
+                await self.action(self._args[key])
+            except Exception as e:
+                logging.exception(f"Scheduled refresh for {key} failed: {e}")
+                for w in waiters:
+                    if not w.done():
+                        w.set_exception(e)
+            else:
+                for w in waiters:
+                    if not w.done():
+                        w.set_result(None)
+
+class RoleCache:
+    """Per-guild role lookup by name, plus which role sets were already ensured."""
+
+    def __init__(self):
+        self._roles: Dict[int, Dict[str, discord.Role]] = {}
+        self._ensured: Dict[int, set] = {}
+
+    def _map(self, guild: discord.Guild) -> Dict[str, discord.Role]:
+        roles = self._roles.get(guild.id)
+        if roles is None:
+            roles = self._roles[guild.id] = {}
+            for r in guild.roles:
+                roles.setdefault(r.name, r)  # first match wins, like discord.utils.get
+        return roles
+
+    def get(self, guild: discord.Guild, name: str) -> Optional[discord.Role]:
+        return self._map(guild).get(name)
+
+    def remember(self, role: discord.Role):
+        """Record a role we just created; the gateway event may not have landed yet."""
+        self._map(role.guild).setdefault(role.name, role)
+
+    def is_ensured(self, guild_id: int, kind: str) -> bool:
+        return kind in self._ensured.get(guild_id, ())
+
+    def mark_ensured(self, guild_id: int, kind: str):
+        self._ensured.setdefault(guild_id, set()).add(kind)
+
+    def invalidate(self, guild_id: int):
+        self._roles.pop(guild_id, None)
+        self._ensured.pop(guild_id, None)
+
+role_cache = RoleCache()
+
+class ChannelMap:
+    """Canonical channel ids per guild in cfg, resolved with guild.get_channel() before any name scan."""
+
+    def __init__(self, delay: float = 1.0):
+        self._saver = RefreshScheduler(self._save, delay)
+
+    async def _save(self, _arg):
+        await store.put_async("cfg", cfg())
+
+    def _channels(self, guild_id: int, create: bool = False) -> Dict[str, int]:
+        guilds = cfg()["guilds"]
+        if create:
+            g = guilds.setdefault(str(guild_id), {"channels": {}, "roles": {}})
+            return g.setdefault("channels", {})
+        return guilds.get(str(guild_id), {}).get("channels", {})
+
+    def update(self, guild_id: int, ids: Dict[str, int]) -> Optional[asyncio.Future]:
+        """Record key -> channel id; returns the pending save if anything changed."""
+        channels = self._channels(guild_id, create=True)
+        changed = {key: cid for key, cid in ids.items() if channels.get(key) != cid}
+        if not changed:
+            return None
+        channels.update(changed)
+        return self._saver.request("cfg", None)
+
+    def forget(self, guild_id: int, channel_id: int):
+        channels = self._channels(guild_id)
+        stale = [key for key, cid in channels.items() if cid == channel_id]
+        for key in stale:
+            del channels[key]
+        if stale:
+            self._saver.request("cfg", None)
+
+    def resolve(self, guild: discord.Guild, key: str, name: str) -> Optional[discord.TextChannel]:
+        """The guild's `key` channel, which must still be a text channel called `name`."""
+        cid = self._channels(guild.id).get(key)
+        ch = guild.get_channel(cid) if cid else None
+        if isinstance(ch, discord.TextChannel) and ch.name == name:
+            return ch
+        ch = discord.utils.get(guild.text_channels, name=name)
+        if ch:
+            self.update(guild.id, {key: ch.id})
+        elif cid:
+            self.forget(guild.id, cid)
+        return ch
+
+channel_map = ChannelMap()
+
+async def run_bounded(items: List[Any], worker: Callable[[Any], Any], concurrency: int,
+                      progress: Optional[Callable[[int, int], Any]] = None) -> int:
+    """Await `worker(item)` for every item, `concurrency` at a time. Returns items done."""
+    total = len(items)
+    it = iter(items)
+    done = 0
+
+    async def run():
+        nonlocal done
+        for item in it:
+            try:
+                await worker(item)
+            except Exception as e:
+                logging.warning(f"Bulk worker failed on {item!r}: {e}")
+            done += 1
+            if progress:
+                await progress(done, total)
+
+    await asyncio.gather(*(run() for _ in range(max(1, min(concurrency, total)))))
+    return done
 
 async def find_or_create_channel(guild: discord.Guild, name: str) -> discord.TextChannel:
     ch = discord.utils.get(guild.text_channels, name=name)
     return ch
+
+def desired_roles(member: discord.Member, managed: Iterable[discord.Role],
+                  want: Iterable[Optional[discord.Role]]) -> Optional[List[discord.Role]]:
+    """Member's full role list holding exactly `want` of the `managed` roles, or None if it already does."""
+    managed_ids = {r.id for r in managed if r}
+    want = [r for r in want if r]
+    if {r.id for r in member.roles if r.id in managed_ids} == {r.id for r in want}:
+        return None
+    keep = [r for r in member.roles if not r.is_default() and r.id not in managed_ids]
+    return keep + want
+
+async def reconcile_roles(guild: discord.Guild, managed: List[discord.Role], holders: Iterable[int],
+                          want: Callable[[discord.Member], List[Optional[discord.Role]]], reason: str,
+                          concurrency: int, progress: Optional[Callable[[int, int], Any]] = None) -> Tuple[int, int]:
+    """Give each holder or managed-role wearer exactly `want(member)` of `managed`. Returns (members changed, members checked)."""
+    managed = [r for r in managed if r]
+    members: Dict[int, discord.Member] = {}
+    for uid in holders:
+        m = guild.get_member(uid)
+        if m:
+            members[uid] = m
+    for role in managed:
+        for m in role.members:
+            members.setdefault(m.id, m)
+
+    plan = []
+    for m in members.values():
+        roles = desired_roles(m, managed, want(m))
+        if roles is not None:
+            plan.append((m, roles))
+
+    async def apply(item):
+        m, roles = item
+        await m.edit(roles=roles, reason=reason)
+
+    await run_bounded(plan, apply, concurrency, progress)
+    return len(plan), len(members)
@@ -0,0 +1,57 @@
+# tests/test_journal.py
+# Crash recovery for the submissions journal (WR_STORAGE=journal).
+from cogs.journal import JournalBackend
+
+
+def _backend(tmp_path):
+    return JournalBackend(
+        str(tmp_path / "submissions.json"), str(tmp_path / "submissions.journal.jsonl"),
+        lambda: {"ops": []}, apply=lambda data, op: data["ops"].append(op["n"]),
+    )
+
+
+def _boot(tmp_path):
+    backend = _backend(tmp_path)
+    return backend, backend.load()
+
+
+def test_replay_after_torn_append(tmp_path):
+    backend, data = _boot(tmp_path)
+    backend.append([{"n": 1}])
+    # Crash partway through the next append
+    with open(backend.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"seq":2,"op":{"n"')
+
+    backend, data = _boot(tmp_path)
+    assert data["ops"] == [1]
+    backend.append([{"n": 2}])
+    backend.append([{"n": 3}])
+
+    _, data = _boot(tmp_path)
+    assert data["ops"] == [1, 2, 3]
+
+
+def test_complete_json_without_newline_is_torn(tmp_path):
+    backend, _ = _boot(tmp_path)
+    backend.append([{"n": 1}])
+    with open(backend.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"seq":2,"op":{"n":2}}')
+
+    backend, data = _boot(tmp_path)
+    assert data["ops"] == [1]
+    backend.append([{"n": 3}])
+    _, data = _boot(tmp_path)
+    assert data["ops"] == [1, 3]
+
+
+def test_replay_after_compaction(tmp_path):
+    backend, data = _boot(tmp_path)
+    for n in (1, 2):
+        data["ops"].append(n)
+        backend.append([{"n": n}])
+    backend.save(data)
+    data["ops"].append(3)
+    backend.append([{"n": 3}])
+
+    _, data = _boot(tmp_path)
+    assert data["ops"] == [1, 2, 3]
@@ -0,0 +1,54 @@
+# tests/test_mutations.py
+# Group commits of submission ops when the durable write fails.
+import asyncio
+import pytest
+from cogs import util
+from cogs.journal import JournalBackend
+
+
+class FlakyJournal(JournalBackend):
+    def append(self, ops):
+        if any(op.get("rec", {}).get("bad") for op in ops):
+            raise OSError("disk full")
+        super().append(ops)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    backend = FlakyJournal(str(tmp_path / "submissions.json"), str(tmp_path / "submissions.journal.jsonl"),
+                           lambda: {"pending": [], "approved": [], "records": []}, apply=util.apply_op)
+    store = util.Store({"subs": backend}, snapshots={"subs": lambda data: data})
+    monkeypatch.setattr(util, "store", store)
+    monkeypatch.setattr(util, "mutations", util.MutationQueue(0.01))
+    return store
+
+
+def _rec(sid, **kw):
+    return dict({"submission_id": sid, "guild_id": 1, "metric": "time", "mode": "Solo", "size": 1,
+                 "players": [7], "value": "1:00", "value_num": 60000}, **kw)
+
+
+def test_failed_write_only_fails_its_own_op(store):
+    async def run():
+        return await asyncio.gather(util.enqueue_submission(_rec("a")), util.enqueue_submission(_rec("b", bad=True)),
+                                    util.enqueue_submission(_rec("c")), return_exceptions=True)
+
+    a, b, c = asyncio.run(run())
+    assert isinstance(b, OSError)
+    assert a["submission_id"] == "a" and c["submission_id"] == "c"
+    assert sorted(r["submission_id"] for r in util.subs()["pending"]) == ["a", "c"]
+    store.reload("subs")
+    assert sorted(r["submission_id"] for r in util.subs()["pending"]) == ["a", "c"]
+
+
+def test_failed_write_leaves_memory_matching_disk(store):
+    async def run():
+        await util.enqueue_submission(_rec("a"))
+        await util.attach_pending_message("a", 10)
+        with pytest.raises(OSError):
+            await util.enqueue_submission(_rec("b", bad=True))
+        return await util.approve_pending(10)
+
+    assert asyncio.run(run())["submission_id"] == "a"
+    assert util.subs()["pending"] == []
+    assert [r["submission_id"] for r in util.subs()["approved"]] == ["a"]
@@ -0,0 +1,46 @@
+# tests/test_sqlite_store.py
+# Per-op writes and leaderboard queries for the SQLite backend (WR_STORAGE=sqlite).
+import json
+from cogs.sqlite_store import SqliteBackend
+
+
+def _rec(sid, time_ms, season=1, **kw):
+    rec = {"submission_id": sid, "guild_id": 1, "metric": "time", "mode": "solo", "size": 1,
+           "season": season, "time_ms": time_ms}
+    rec.update(kw)
+    return rec
+
+
+def _backend(tmp_path, json_data=None):
+    json_path = tmp_path / "submissions.json"
+    if json_data is not None:
+        json_path.write_text(json.dumps(json_data))
+    return SqliteBackend(str(tmp_path / "wr.db"), json_path=str(json_path), sort_key=lambda r: r["time_ms"])
+
+
+def test_ops_round_trip(tmp_path):
+    backend = _backend(tmp_path)
+    backend.append([{"op": "enqueue", "rec": _rec("a", 300)}, {"op": "enqueue", "rec": _rec("b", 200)},
+                    {"op": "enqueue", "rec": _rec("c", 100)}])
+    backend.append([{"op": "attach", "submission_id": sid, "message_id": mid} for sid, mid in (("a", 10), ("b", 20), ("c", 30))])
+    backend.append([{"op": "approve", "message_id": 20}, {"op": "reject", "message_id": 30},
+                    {"op": "approve", "message_id": 99}])
+
+    data = _backend(tmp_path).load()
+    assert [(r["submission_id"], r["pending_message_id"]) for r in data["pending"]] == [("a", 10)]
+    assert [r["submission_id"] for r in data["approved"]] == ["b"]
+    assert data["records"] == []
+
+
+def test_leaderboard_ranks_records_and_approved(tmp_path):
+    backend = _backend(tmp_path, {"pending": [], "records": [_rec("r1", 200), _rec("old", 50, season=1)],
+                                  "approved": [_rec("x", 200), _rec("y", 100, season=2)]})
+    backend.append([{"op": "enqueue", "rec": _rec("z", 150, season=2)},
+                    {"op": "attach", "submission_id": "z", "message_id": 5},
+                    {"op": "approve", "message_id": 5}])
+
+    assert backend.current_season(1) == 2
+    assert backend.current_season(2) == 1
+    assert [r["submission_id"] for r in backend.leaderboard(1, "time", "solo", 1)] == ["y", "z"]
+    assert [r["submission_id"] for r in backend.leaderboard(1, "time", "solo", 1, "1")] == ["old", "r1", "x"]
+    assert [r["submission_id"] for r in backend.leaderboard(1, "time", "solo", 1, "1", k=2)] == ["old", "r1"]